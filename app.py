@@ -491,17 +491,32 @@
 
 import streamlit as st
 import pandas as pd
+import numpy as np
 import time
 import datetime
 import speech_recognition as sr
 import gspread
+import requests
 from oauth2client.service_account import ServiceAccountCredentials
 from streamlit_mic_recorder import mic_recorder
-import io
 from pydub import AudioSegment
-from groq import Groq
+from groq import Groq, APIConnectionError, APIStatusError
 import json
 import re
+import os
+import threading
+import uuid
+import contextlib
+import sqlite3
+import itertools
+import collections
+import hashlib
+import subprocess
+import random
+import argparse
+import sys
+import abc
+from concurrent.futures import ThreadPoolExecutor
 
 st.set_page_config(page_title="RC Sales AI (Final)", layout="wide", page_icon="🚀")
 
@@ -509,6 +524,40 @@ st.set_page_config(page_title="RC Sales AI (Final)", layout="wide", page_icon="
 # 1. CONNECTIONS
 # ==========================================
 SHEET_NAME = "RC_Sales_Database"
+LOCAL_DATA_DIR = ".rc_local"   # ไฟล์ cache / journal ฝั่งเครื่อง
+
+# วัดเวลาแต่ละ operation (ดูได้ที่ Sidebar > ⏱️ Latency)
+class LatencyStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ops = {}
+
+    def record(self, op_name, seconds):
+        with self.lock:
+            op = self.ops.setdefault(op_name, {"calls": 0, "total": 0.0, "max": 0.0, "last": 0.0})
+            op["calls"] += 1
+            op["total"] += seconds
+            op["max"] = max(op["max"], seconds)
+            op["last"] = seconds
+
+    def summary(self):
+        with self.lock:
+            rows = [
+                {"op": name, "calls": op["calls"], "avg_ms": round(op["total"] / op["calls"] * 1000, 1),
+                 "last_ms": round(op["last"] * 1000, 1), "max_ms": round(op["max"] * 1000, 1)}
+                for name, op in sorted(self.ops.items())
+            ]
+        return pd.DataFrame(rows)
+
+@st.cache_resource
+def get_latency_stats():
+    return LatencyStats()
+
+@contextlib.contextmanager
+def timed(op_name):
+    start = time.perf_counter()
+    try: yield
+    finally: get_latency_stats().record(op_name, time.perf_counter() - start)
 
 @st.cache_resource
 def init_connection():
@@ -517,131 +566,1533 @@ def init_connection():
     client = gspread.authorize(creds)
     return client
 
+# เก็บ handle ของ Spreadsheet/Worksheet ไว้ใช้ซ้ำ (ไม่ต้อง open + worksheet ทุกครั้ง = ประหยัด 2 round trips)
+class WorksheetRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spreadsheet = None
+        self.worksheets = {}
+
+    def _open_spreadsheet(self):
+        if self.spreadsheet is None:
+            with timed("sheets.open_spreadsheet"): self.spreadsheet = init_connection().open(SHEET_NAME)
+        return self.spreadsheet
+
+    def get_spreadsheet(self):
+        with self.lock: return self._open_spreadsheet()
+
+    def get(self, worksheet_name):
+        with self.lock:
+            if worksheet_name not in self.worksheets:
+                spreadsheet = self._open_spreadsheet()
+                with timed("sheets.open_worksheet"): self.worksheets[worksheet_name] = spreadsheet.worksheet(worksheet_name)
+            return self.worksheets[worksheet_name]
+
+    def invalidate(self):
+        with self.lock:
+            self.spreadsheet = None
+            self.worksheets = {}
+
+@st.cache_resource
+def get_worksheet_registry():
+    return WorksheetRegistry()
+
+def is_stale_handle_error(e):
+    # ล้าง handle เฉพาะกรณี auth หมดอายุ / หาชีตไม่เจอ เท่านั้น
+    if isinstance(e, (gspread.exceptions.WorksheetNotFound, gspread.exceptions.SpreadsheetNotFound)): return True
+    return isinstance(e, gspread.exceptions.APIError) and e.code in (401, 403, 404)
+
+def _with_handle(get_handle, op_name, fn):
+    registry = get_worksheet_registry()
+    for attempt in range(2):
+        try:
+            handle = get_handle(registry)
+            with timed(f"sheets.{op_name}"): return fn(handle)
+        except Exception as e:
+            if attempt or not is_stale_handle_error(e): raise
+            registry.invalidate()
+            if isinstance(e, gspread.exceptions.APIError) and e.code == 401: init_connection.clear()
+
+def with_spreadsheet(op_name, fn):
+    return _with_handle(lambda registry: registry.get_spreadsheet(), op_name, fn)
+
+def with_worksheet(worksheet_name, op_name, fn):
+    return _with_handle(lambda registry: registry.get(worksheet_name), op_name, fn)
+
 @st.cache_data(ttl=60)
 def get_data(worksheet_name):
     try:
-        client = init_connection()
-        sheet = client.open(SHEET_NAME)
-        worksheet = sheet.worksheet(worksheet_name)
-        data = worksheet.get_all_records()
+        data = with_worksheet(worksheet_name, "get_all_records", lambda ws: ws.get_all_records())
         df = pd.DataFrame(data)
         if not df.empty: df.columns = [str(c).strip() for c in df.columns]
         return df
     except: return pd.DataFrame()
 
-def append_data(worksheet_name, row_data):
+# โหลดทุกชีตที่หน้าเว็บใช้ใน values_batch_get ครั้งเดียว (1 round trip แทน 3+)
+DATA_SHEETS = ("Assignments", "Missions", "Reports")
+APP_SHEETS = ("Assignments", "Missions")   # โหลดทุก rerun / Reports โหลดเฉพาะแท็บรายงานของผู้จัดการ
+
+def values_to_frame(values):
+    # ให้ผลเหมือน get_all_records: แถวแรก = header, เติมช่องว่างท้ายแถว, แปลงตัวเลข
+    if not values: return pd.DataFrame()
+    header = [str(c).strip() for c in values[0]]
+    if len(values) < 2: return pd.DataFrame(columns=header)  # เก็บ header ไว้ให้ write-through ใช้ต่อได้
+    rows = [gspread.utils.numericise_all((row + [""] * len(header))[:len(header)]) for row in values[1:]]
+    return pd.DataFrame(rows, columns=header)
+
+# ==========================================
+# 1.0.1 REPORTS DELTA SYNC (Reports เป็น append-only -> ดึงเฉพาะแถวใหม่)
+# ==========================================
+REPORTS_CACHE_PATH = os.path.join(LOCAL_DATA_DIR, "reports_cache.pkl")
+# mtime ของไฟล์นี้ = "รุ่น" ของ Reports: เปลี่ยนเมื่อแถวเก่าถูกแก้ (เช่น batch job) ไม่ใช่แค่ต่อท้าย
+REPORTS_GENERATION_PATH = os.path.join(LOCAL_DATA_DIR, "reports_generation")
+
+def reports_generation():
+    try: return os.stat(REPORTS_GENERATION_PATH).st_mtime_ns
+    except FileNotFoundError: return 0
+
+def touch_reports_generation():
+    os.makedirs(os.path.dirname(REPORTS_GENERATION_PATH), exist_ok=True)
+    with open(REPORTS_GENERATION_PATH, "a"): pass
+    os.utime(REPORTS_GENERATION_PATH)
+
+def trim_row(row):
+    # Sheets API ตัดช่องว่างท้ายแถวทิ้งอยู่แล้ว ทำให้เทียบแถวได้ตรงกัน
+    row = [str(c) for c in row]
+    while row and row[-1] == "": row.pop()
+    return row
+
+class ReportsSync:
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.lock = threading.Lock()
+        self._reset([])
+        try:
+            state = pd.read_pickle(self.cache_path)
+            self.header, self.last_row, self.n_rows, self.df = state["header"], state["last_row"], state["n_rows"], state["df"]
+        except Exception: pass  # ไม่มีไฟล์ / ไฟล์เสีย -> โหลดเต็มรอบแรก
+
+    def _reset(self, values):
+        self.header = trim_row(values[0]) if values else []
+        self.n_rows = max(len(values) - 1, 0)
+        self.last_row = trim_row(values[-1]) if values else []
+        self.df = values_to_frame(values)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        pd.to_pickle({"header": self.header, "last_row": self.last_row, "n_rows": self.n_rows, "df": self.df}, tmp_path)
+        os.replace(tmp_path, self.cache_path)
+
+    def ranges(self):
+        # ขอ header + ตั้งแต่ "แถวสุดท้ายที่เคยเห็น" ลงไป (แถวนั้นใช้เช็คว่าชีตไม่ได้ถูกลบ/แก้)
+        # ไฟล์ cache ถูกลบจากที่อื่น (เช่น batch job แก้แถวเก่า) -> โหลดเต็มใหม่
+        if self.header and not os.path.exists(self.cache_path): self._reset([])
+        if not self.header: return ["'Reports'"]
+        last_col = gspread.utils.rowcol_to_a1(1, len(self.header))[:-1]
+        return ["'Reports'!1:1", f"'Reports'!A{self.n_rows + 1}:{last_col}"]
+
+    def apply(self, value_ranges):
+        with self.lock:
+            if not self.header:
+                self._reset(value_ranges[0])
+            else:
+                header_values, delta_values = value_ranges
+                header = trim_row(header_values[0]) if header_values else []
+                if header != self.header or not delta_values or trim_row(delta_values[0]) != self.last_row:
+                    # header เปลี่ยน / แถวหาย -> resync ทั้งชีต
+                    self._reset(with_worksheet("Reports", "get_all_values", lambda ws: ws.get_all_values()))
+                elif len(delta_values) > 1:
+                    new_rows = delta_values[1:]
+                    self.df = pd.concat([self.df, values_to_frame([self.header] + new_rows)], ignore_index=True)
+                    self.n_rows += len(new_rows)
+                    self.last_row = trim_row(new_rows[-1])
+            self._save()
+            return self.df  # ไม่ก๊อป: SheetCache เก็บไว้ต่อ และก๊อปให้ผู้เรียกเอง
+
+    def invalidate(self):
+        with self.lock:
+            self._reset([])
+            try: os.remove(self.cache_path)
+            except FileNotFoundError: pass
+
+@st.cache_resource
+def get_reports_sync():
+    return ReportsSync(REPORTS_CACHE_PATH)
+
+# error จาก Sheets API / network ที่ fetch_sheets จัดการเอง (ที่เหลือ = bug -> ให้เห็น)
+SHEETS_FETCH_ERRORS = (gspread.exceptions.GSpreadException, requests.exceptions.RequestException)
+
+def is_sheets_quota_error(e):
+    # 429 / 5xx / network: ยิงซ้ำทันทีมีแต่จะโดนจำกัดหนักขึ้น
+    if isinstance(e, requests.exceptions.RequestException): return True
+    return isinstance(e, gspread.exceptions.APIError) and (e.code == 429 or e.code >= 500)
+
+def fetch_sheets(worksheet_names):
+    reports_sync = get_reports_sync()
     try:
-        client = init_connection()
-        sheet = client.open(SHEET_NAME)
-        worksheet = sheet.worksheet(worksheet_name)
-        worksheet.append_row(row_data)
-        st.cache_data.clear()
+        plain_names = [name for name in worksheet_names if name != "Reports"]
+        ranges = [f"'{name}'" for name in plain_names]
+        if "Reports" in worksheet_names: ranges += reports_sync.ranges()
+        response = with_spreadsheet("values_batch_get", lambda sh: sh.values_batch_get(ranges))
+        value_ranges = [vr.get("values", []) for vr in response.get("valueRanges", [])]
+        data = {name: values_to_frame(values) for name, values in zip(plain_names, value_ranges)}
+        if "Reports" in worksheet_names: data["Reports"] = reports_sync.apply(value_ranges[len(plain_names):])
+        return data
+    except SHEETS_FETCH_ERRORS as e:
+        # โดนจำกัด quota / network -> ไม่แตกเป็นทีละชีต ให้ SheetCache ใช้ข้อมูลเดิมไปก่อนแล้วลองใหม่รอบหน้า
+        if is_sheets_quota_error(e): raise
+        # delta range ของ Reports เกินขนาดชีต (แถวถูกลบ) -> sync ใหม่ทั้งชีต / error อื่น (เช่น บางชีตหาไม่เจอ) ไม่แตะ state ของ Reports
+        if "Reports" in worksheet_names and reports_sync.header and "Reports" in str(e): reports_sync.invalidate()
+        return {name: get_data(name) for name in worksheet_names}
+
+# ==========================================
+# 1.0.2 SHEET CACHE (cache แยกรายชีต + write-through แทน st.cache_data.clear())
+# ==========================================
+SHEET_CACHE_TTL_SEC = 60
+next_data_version = itertools.count(1).__next__   # เลข version ของข้อมูล เปลี่ยนทุกครั้งที่ชีตถูกโหลดใหม่/แก้ไข
+
+def append_rows_to_frame(df, rows):
+    if len(df.columns) == 0: return df  # ยังไม่รู้ header -> รอโหลดรอบหน้า
+    new_rows = values_to_frame([list(df.columns)] + [[str(v) for v in row] for row in rows])
+    if df.empty: return new_rows
+    return pd.concat([df, new_rows], ignore_index=True)
+
+class SheetCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = {}   # worksheet_name -> {"df": DataFrame, "loaded_at": float, "version": int}
+
+    def get(self, worksheet_names, copy=True):
+        # copy=False: คืน DataFrame ตัวที่ cache ไว้ (อ่านอย่างเดียว ห้ามแก้ในที่)
+        with self.lock:
+            now = time.time()
+            stale = [name for name in worksheet_names if name not in self.entries or now - self.entries[name]["loaded_at"] > self.ttl]
+            if stale:
+                queue = get_write_queue()
+                # ถือ flush_lock ไว้: แถวที่ยังอยู่ในคิว = ยังไม่ถึงชีตแน่นอน เอามาต่อท้ายได้โดยไม่ซ้ำ
+                with queue.flush_lock:
+                    try: fresh = fetch_sheets(tuple(stale))
+                    except SHEETS_FETCH_ERRORS:
+                        # โดนจำกัด quota / network: ใช้ข้อมูลเดิมต่ออีกรอบ TTL / ยังไม่เคยโหลดเลย -> โยนต่อ
+                        if any(name not in self.entries for name in stale): raise
+                        for name in stale: self.entries[name]["loaded_at"] = now
+                        stale = []
+                    for name in stale:
+                        df = fresh.get(name, pd.DataFrame())
+                        pending_rows = queue.pending_rows(name)
+                        if pending_rows: df = append_rows_to_frame(df, pending_rows)
+                        self.entries[name] = {"df": df, "loaded_at": now, "version": next_data_version()}
+            return {name: self._copy(self.entries[name]) if copy else self._shared(self.entries[name]) for name in worksheet_names}
+
+    def _copy(self, entry):
+        df = entry["df"].copy()
+        df.attrs["data_version"] = entry["version"]
+        return df
+
+    def _shared(self, entry):
+        entry["df"].attrs["data_version"] = entry["version"]  # แก้แค่ metadata ให้ get_data_index ใช้เป็น key
+        return entry["df"]
+
+    def append_rows(self, worksheet_name, rows, queue=None):
+        with self.lock:
+            # เข้าคิวภายใต้ lock เดียวกับ cache: ถ้า get() โหลดใหม่คั่นระหว่างเข้าคิวกับต่อท้าย แถวจะมาซ้ำจาก pending_rows
+            if queue is not None:
+                for row in rows: queue.enqueue(worksheet_name, row)
+            entry = self.entries.get(worksheet_name)
+            if entry is not None:
+                entry["df"] = append_rows_to_frame(entry["df"], rows)
+                entry["version"] = next_data_version()
+
+    def drop_where(self, worksheet_name, column, value):
+        # index ต้องเรียงใหม่เสมอ (index + 2 = เลขแถวในชีต)
+        with self.lock:
+            entry = self.entries.get(worksheet_name)
+            if entry is not None and column in entry["df"].columns:
+                df = entry["df"]
+                entry["df"] = df[df[column] != value].reset_index(drop=True)
+                entry["version"] = next_data_version()
+
+    def invalidate(self, worksheet_name=None):
+        with self.lock:
+            if worksheet_name is None: self.entries = {}
+            else: self.entries.pop(worksheet_name, None)
+
+@st.cache_resource
+def get_sheet_cache():
+    return SheetCache(SHEET_CACHE_TTL_SEC)
+
+# ==========================================
+# 1.1 WRITE-BEHIND QUEUE (บันทึกเบื้องหลัง + Journal กันข้อมูลหาย)
+# ==========================================
+WRITE_JOURNAL_PATH = os.path.join(LOCAL_DATA_DIR, "pending_writes.jsonl")
+FLUSH_DELAY_SEC = 0.5     # รอรวมแถวที่เข้ามาติดๆ กันให้เป็น batch เดียว
+FLUSH_RETRY_SEC = 15      # ถ้า flush ไม่ผ่าน ให้ลองใหม่ทุกๆ กี่วินาที
+
+class WriteBehindQueue:
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.lock = threading.Lock()          # คุม pending + ไฟล์ journal
+        self.flush_lock = threading.RLock()   # ให้ flush ทีละรอบเท่านั้น / กันแถวในชีตเลื่อนระหว่างอ่าน-เขียนตามเลขแถว
+        self.wakeup = threading.Event()
+        self.pending = []
+        self.flushed_rows = 0
+        self.last_flush = None
+        self.last_error = None
+        self._load_journal()
+        threading.Thread(target=self._run, name="sheet-writer", daemon=True).start()
+
+    def _load_journal(self):
+        # โหลดแถวที่ค้างจากรอบก่อน (rerun / process crash)
+        if not os.path.exists(self.journal_path): return
+        with open(self.journal_path, encoding="utf-8") as f:
+            for line in f:
+                try: self.pending.append(json.loads(line))
+                except ValueError: pass  # บรรทัดที่เขียนไม่จบตอน crash
+        if self.pending: self.wakeup.set()
+
+    def _rewrite_journal(self):
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for item in self.pending: f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.journal_path)
+
+    def enqueue(self, worksheet_name, row_data):
+        self._enqueue_item({"id": uuid.uuid4().hex, "worksheet": worksheet_name, "row": list(row_data)})
+
+    def enqueue_delete(self, worksheet_name, customer_name):
+        # ใช้ตอน mirror: ลบงานของลูกค้าในชีต ตามลำดับเดียวกับแถวที่ append
+        self._enqueue_item({"id": uuid.uuid4().hex, "worksheet": worksheet_name, "op": "delete_customer", "customer": customer_name})
+
+    def _enqueue_item(self, item):
+        with self.lock:
+            # เขียนลง journal ก่อน แล้วค่อยเข้าคิว
+            os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending.append(item)
+        self.wakeup.set()
+
+    def pending_rows(self, worksheet_name):
+        with self.lock: return [item["row"] for item in self.pending if item["worksheet"] == worksheet_name and "row" in item]
+
+    def flush(self, worksheet_name=None):
+        with self.flush_lock:
+            with self.lock: batch = [item for item in self.pending if worksheet_name in (None, item["worksheet"])]
+            if not batch: return True
+
+            # รวมแถวตามชีต (คงลำดับเดิม) -> append_rows ชีตละ 1 ครั้ง
+            # ถ้ามีคำสั่งลบคั่นอยู่ ต้องส่งแถวก่อนหน้าให้ครบก่อนค่อยลบ
+            done_ids, errors, groups = set(), [], {}
+            for item in batch + [None]:
+                if item is not None and item.get("op") != "delete_customer":
+                    groups.setdefault(item["worksheet"], []).append(item)
+                    continue
+                for name, items in groups.items():
+                    try:
+                        rows = [i["row"] for i in items]
+                        with_worksheet(name, "append_rows", lambda ws: ws.append_rows(rows))
+                        done_ids.update(i["id"] for i in items)
+                        get_data.clear(name)
+                    except Exception as e: errors.append(f"{name}: {e}")
+                groups = {}
+                if item is None or errors: break
+                try:
+                    sheets_delete_customer_rows(item["customer"])
+                    done_ids.add(item["id"])
+                except Exception as e:
+                    errors.append(f"{item['worksheet']} (delete): {e}")
+                    break
+
+            with self.lock:
+                self.pending = [item for item in self.pending if item["id"] not in done_ids]
+                self._rewrite_journal()
+                self.flushed_rows += len(done_ids)
+                self.last_flush = datetime.datetime.now()
+                self.last_error = "; ".join(errors) if errors else None
+            return not errors
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(timeout=FLUSH_RETRY_SEC)
+            self.wakeup.clear()
+            time.sleep(FLUSH_DELAY_SEC)
+            try: self.flush()
+            except Exception as e: self.last_error = str(e)
+
+    def status(self):
+        with self.lock:
+            return {
+                "pending": len(self.pending),
+                "flushed_rows": self.flushed_rows,
+                "last_flush": self.last_flush,
+                "last_error": self.last_error,
+            }
+
+@st.cache_resource
+def get_write_queue():
+    return WriteBehindQueue(WRITE_JOURNAL_PATH)
+
+def merge_row_ranges(rows):
+    # รวมแถวที่ติดกันเป็นช่วงเดียว เช่น [2,3,4,7] -> [(2,4), (7,7)]
+    ranges = []
+    for r in sorted(set(rows)):
+        if ranges and r == ranges[-1][1] + 1: ranges[-1][1] = r
+        else: ranges.append([r, r])
+    return [(start, end) for start, end in ranges]
+
+def sheets_delete_customer_rows(customer_name):
+    # อ่านคอลัมน์ Customer ใหม่ก่อนลบเสมอ (request เดียว): DataFrame ที่โหลดไว้ตอนเปิดหน้าอาจเก่าแล้ว
+    # (ระหว่างรอ LLM ถ้า session อื่นปิดงานไปก่อน แถวจะเลื่อน -> ลบผิดลูกค้า)
+    customer_col = SHEET_COLUMNS["Missions"].index("Customer") + 1
+    def batch_delete(ws):
+        customers = ws.col_values(customer_col)
+        rows_to_delete = [i + 1 for i, value in enumerate(customers) if i > 0 and value == customer_name]
+        if not rows_to_delete: return None
+        # ส่งคำสั่งลบทั้งหมดใน batch_update เดียว เรียงจากล่างขึ้นบนเพื่อไม่ให้แถวเลื่อน
+        requests = [
+            {"deleteDimension": {"range": {"sheetId": ws.id, "dimension": "ROWS", "startIndex": start - 1, "endIndex": end}}}
+            for start, end in reversed(merge_row_ranges(rows_to_delete))
+        ]
+        return ws.spreadsheet.batch_update({"requests": requests})
+    # ถือ flush_lock: ไม่ให้ลบแถวคั่นกลางงานที่อ่านแล้วเขียนกลับตามเลขแถว (sheets_backfill_due_dates)
+    with get_write_queue().flush_lock: with_worksheet("Missions", "batch_delete", batch_delete)
+    get_data.clear("Missions")
+
+# ==========================================
+# 1.2 STORAGE BACKEND (Repository: Google Sheets / SQLite)
+# ==========================================
+SQLITE_PATH = os.path.join(LOCAL_DATA_DIR, "rc_sales.db")
+
+# คอลัมน์มาตรฐานของแต่ละตาราง (เรียงตามลำดับที่ append ลงชีต)
+SHEET_COLUMNS = {
+    "Assignments": ["Sales_Rep", "Customer"],
+    "Missions": ["Customer", "topic", "desc", "status", "Sales_Rep", "due_date"],
+    "Reports": ["Timestamp", "Sales_Rep", "Customer", "Topics", "Status", "Sentiment", "Summary"],
+}
+
+def get_setting(key, default=None):
+    try: return st.secrets.get(key, default)
+    except Exception: return default  # ไม่มีไฟล์ secrets (เช่น รัน offline)
+
+def get_bool_setting(key, default):
+    # ค่าใน secrets อาจเป็น string ("false", "0", "no") -> bool("false") จะได้ True
+    value = get_setting(key, default)
+    if isinstance(value, str): return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(value)
+
+def get_number_setting(key, default):
+    # ค่าใน secrets อาจเป็น string ("30") / แปลงไม่ได้ หรือไม่เป็นบวก -> ใช้ค่า default
+    try: value = float(get_setting(key, default))
+    except (TypeError, ValueError): return default
+    return value if value > 0 else default
+
+def has_sheets_credentials():
+    try: return "gcp_service_account" in st.secrets
+    except Exception: return False
+
+class SalesRepository(abc.ABC):
+    # interface กลางของแหล่งข้อมูล Assignments / Missions / Reports (UI เรียกผ่านตัวนี้เท่านั้น)
+    # abstractmethod: backend ที่ขาดเมธอดไหน พังตั้งแต่ตอนสร้าง ไม่ใช่กลาง request
+    name = "base"
+
+    @abc.abstractmethod
+    def load(self, worksheet_names): ...
+    @abc.abstractmethod
+    def append(self, worksheet_name, row_data): ...
+    @abc.abstractmethod
+    def delete_missions(self, customer_name): ...
+
+    def close_visit(self, report_row, customer_name, followup_row=None):
+        self.append("Reports", report_row)
+        self.delete_missions(customer_name)
+        if followup_row: self.append("Missions", followup_row)
+
+    # ใช้กับ batch job: อ่าน Reports ทีละหน้า [(row_id, [cells ตามลำดับ SHEET_COLUMNS])] / เขียน Sentiment กลับทีเดียว
+    first_report_row = 1
+    @abc.abstractmethod
+    def iter_report_pages(self, start_row, page_size): ...
+    @abc.abstractmethod
+    def update_report_sentiments(self, updates): ...
+
+    # ใช้กับ analytics: Reports ตั้งแต่แถว cursor (index ของ DataFrame) ลงไป รวมแถว cursor เอง (ไว้เช็คว่าแถวเดิมไม่ถูกแก้)
+    @abc.abstractmethod
+    def report_rows_from(self, cursor): ...
+
+    # ตารางฝั่งผู้จัดการ: กรอง + ตัดหน้าที่ฝั่ง server คืน (DataFrame เฉพาะหน้านั้น, จำนวนแถวที่ผ่านตัวกรองทั้งหมด)
+    # ค่าเริ่มต้น: กรองบน DataFrame ที่ cache ไว้ต่อ data version (ชีตไม่มี index ให้ query)
+    def load_shared(self, worksheet_names): return self.load(worksheet_names)
+
+    def query_page(self, worksheet_name, filters, offset, limit):
+        data = self.load_shared(("Assignments", worksheet_name))
+        df = data[worksheet_name]
+        if worksheet_name == "Missions": df = get_data_index(data["Assignments"], df).missions_with_rep
+        df = filter_table(df, worksheet_name, filters)
+        if worksheet_name in TABLE_NEWEST_FIRST: df = df.iloc[::-1]
+        return df.iloc[offset:offset + limit], len(df)
+
+    def invalidate(self): pass
+
+def sheets_backfill_due_dates():
+    # เติม due_date ให้แถวเก่าใน Missions: parse ครั้งเดียว แล้วเขียนเฉพาะช่องที่ว่างใน batch_update เดียว
+    # ถือ flush_lock ตั้งแต่อ่านจนเขียนเสร็จ: ระหว่างนั้นไม่มีการลบแถวจาก session อื่น/คิว ที่จะทำให้วันที่ลงผิดงาน
+    with get_write_queue().flush_lock:
+        values = with_worksheet("Missions", "get_all_values", lambda ws: ws.get_all_values())
+        if len(values) < 2: return 0
+        header = [str(c).strip() for c in values[0]]
+        col = SHEET_COLUMNS["Missions"].index("due_date")
+        if col < len(header) and header[col] not in ("", "due_date"): return 0  # คอลัมน์นี้ถูกใช้อย่างอื่นอยู่ -> ไม่ทับ
+        rows = [(row + [""] * (col + 1))[:col + 1] for row in values[1:]]
+        topic_col = header.index("topic") if "topic" in header else 1
+        desc_col = header.index("desc") if "desc" in header else 2
+        stored = pd.Series([row[col] for row in rows])
+        blank = stored == ""
+        if header[col:col + 1] == ["due_date"] and not blank.any(): return 0
+        texts = pd.Series([f"{row[topic_col]} {row[desc_col]}" for row in rows])[blank]
+        due_dates = format_due_dates(classify_mission_dates(texts)["due_date"])  # index = ตำแหน่งแถว (0 = แถว 2 ในชีต)
+        column_letter = gspread.utils.rowcol_to_a1(1, col + 1)[:-1]
+        updates = [] if header[col:col + 1] == ["due_date"] else [{"range": f"{column_letter}1", "values": [["due_date"]]}]
+        for start, end in merge_row_ranges(due_dates.index + 2):
+            updates.append({"range": f"{column_letter}{start}:{column_letter}{end}", "values": [[v] for v in due_dates.loc[start - 2:end - 2]]})
+        with_worksheet("Missions", "backfill_due_date", lambda ws: ws.batch_update(updates))
+    get_data.clear("Missions")
+    return int(blank.sum())
+
+class SheetsRepository(SalesRepository):
+    name = "sheets"
+
+    def __init__(self):
+        self.due_dates_backfilled = False
+
+    def load(self, worksheet_names):
+        self._backfill_once(worksheet_names)
+        return get_sheet_cache().get(tuple(worksheet_names))
+
+    def load_shared(self, worksheet_names):
+        self._backfill_once(worksheet_names)
+        return get_sheet_cache().get(tuple(worksheet_names), copy=False)
+
+    def _backfill_once(self, worksheet_names):
+        if "Missions" in worksheet_names and not self.due_dates_backfilled:
+            self.due_dates_backfilled = True
+            try:
+                # แถวที่ยังค้างในคิวต้องลงชีตก่อน เลขแถวจะได้ตรง
+                get_write_queue().flush("Missions")
+                if sheets_backfill_due_dates(): get_sheet_cache().invalidate("Missions")
+            except Exception as e: st.warning(f"Backfill Error: {e}")
+
+    def append(self, worksheet_name, row_data):
+        # write-behind + write-through: เห็นแถวใหม่ทันทีโดยไม่ต้องโหลดชีตใหม่
+        get_sheet_cache().append_rows(worksheet_name, [row_data], queue=get_write_queue())
+
+    def delete_missions(self, customer_name):
+        # Missions ที่ยังค้างในคิวต้องลงชีตก่อน ไม่งั้นแถวของลูกค้านี้ที่ยังไม่ถึงชีตจะไม่ถูกลบ
+        get_write_queue().flush("Missions")
+        sheets_delete_customer_rows(customer_name)
+        get_sheet_cache().drop_where("Missions", "Customer", customer_name)
+
+    def close_visit(self, report_row, customer_name, followup_row=None):
+        # ลบงานเก่าก่อน แล้วค่อยเข้าคิว Reports + งานใหม่: ลบไม่สำเร็จ -> ยังไม่มีแถวไหนเข้าคิว กดบันทึกซ้ำได้โดยรายงานไม่ซ้ำ
+        self.delete_missions(customer_name)
+        self.append("Reports", report_row)
+        if followup_row: self.append("Missions", followup_row)
+
+    first_report_row = 2  # แถว 1 = header
+
+    def iter_report_pages(self, start_row, page_size):
+        last_col = gspread.utils.rowcol_to_a1(1, len(SHEET_COLUMNS["Reports"]))[:-1]
+        row = start_row
+        while True:
+            page_range = f"A{row}:{last_col}{row + page_size - 1}"
+            try: values = with_worksheet("Reports", "get_report_page", lambda ws: ws.get(page_range))
+            except gspread.exceptions.APIError as e:
+                # หน้าก่อนหน้าเต็มพอดีกับขนาด grid ของชีต (หรือ resume จากแถวสุดท้าย) -> หน้านี้เริ่มเลยแถวสุดท้าย = จบ
+                if e.code == 400 and "exceeds grid limits" in str(e): return
+                raise
+            if values: yield [(row + i, list(cells)) for i, cells in enumerate(values)]
+            if len(values) < page_size: return  # หน้าไม่เต็ม = หน้าสุดท้าย ไม่ต้องขอหน้าว่างอีกรอบ
+            row += page_size
+
+    def update_report_sentiments(self, updates):
+        col_letter = gspread.utils.rowcol_to_a1(1, SHEET_COLUMNS["Reports"].index("Sentiment") + 1)[:-1]
+        data = [{"range": f"{col_letter}{row}", "values": [[sentiment]]} for row, sentiment in updates.items()]
+        with_worksheet("Reports", "update_sentiments", lambda ws: ws.batch_update(data))
+        # แก้แถวเก่า (delta sync ไม่เห็น) -> ให้ทุก process โหลด Reports เต็มรอบใหม่
+        get_reports_sync().invalidate()
+        get_sheet_cache().invalidate("Reports")
+        touch_reports_generation()
+
+    def report_rows_from(self, cursor):
+        # Reports ใน cache มี RangeIndex (ต่อท้ายอย่างเดียว) -> index = ตำแหน่งแถว
+        return get_sheet_cache().get(("Reports",), copy=False)["Reports"].iloc[cursor or 0:]
+
+    def invalidate(self):
+        get_sheet_cache().invalidate()
+
+def quote_columns(columns):
+    return ", ".join(f'"{c}"' for c in columns)
+
+class SQLiteRepository(SalesRepository):
+    # เก็บข้อมูลในเครื่อง (WAL) แล้วค่อย mirror ขึ้น Google Sheets ผ่าน write-behind queue
+    name = "sqlite"
+
+    def __init__(self, db_path, mirror_to_sheets=False):
+        self.db_path = db_path
+        self.mirror_to_sheets = mirror_to_sheets
+        self.local = threading.local()   # sqlite3 connection แยกตาม thread
+        self.versions = {name: next_data_version() for name in SHEET_COLUMNS}
+        self.frames = {}                 # worksheet_name -> (version, DataFrame) ที่อ่านล่าสุด
+        self.reports_generation = reports_generation()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            for name, columns in SHEET_COLUMNS.items():
+                table = name.lower()
+                column_defs = ", ".join(f'"{c}" TEXT' for c in columns)
+                conn.execute(f'CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_defs})')
+                # migrate: เติมคอลัมน์ที่เพิ่มมาทีหลัง (เช่น due_date)
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                for c in columns:
+                    if c not in existing: conn.execute(f'ALTER TABLE {table} ADD COLUMN "{c}" TEXT')
+                for c in ("Customer", "Sales_Rep", "due_date", "status", "Timestamp", "Sentiment"):
+                    if c in columns: conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_{c.lower()} ON {table}("{c}")')
+        if mirror_to_sheets and self._is_empty(): self.import_from_sheets(DATA_SHEETS)
+        self.backfill_due_dates()
+        self.backfill_mission_reps()
+
+    def _conn(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def _touch(self, *worksheet_names):
+        for name in worksheet_names: self.versions[name] = next_data_version()
+
+    def _is_empty(self):
+        conn = self._conn()
+        return all(conn.execute(f"SELECT COUNT(*) FROM {name.lower()}").fetchone()[0] == 0 for name in SHEET_COLUMNS)
+
+    def _insert(self, conn, worksheet_name, rows):
+        columns = SHEET_COLUMNS[worksheet_name]
+        values = [(list(row) + [""] * len(columns))[:len(columns)] for row in rows]
+        placeholders = ", ".join("?" * len(columns))
+        conn.executemany(f"INSERT INTO {worksheet_name.lower()} ({quote_columns(columns)}) VALUES ({placeholders})", values)
+
+    def import_from_sheets(self, worksheet_names):
+        frames = fetch_sheets(tuple(worksheet_names))
+        conn = self._conn()
+        with conn:
+            for name in worksheet_names:
+                df = frames.get(name, pd.DataFrame())
+                if len(df.columns) == 0: continue  # โหลดชีตไม่สำเร็จ -> อย่าล้างข้อมูลในเครื่อง
+                if name == "Reports": rows = df.values.tolist()  # Reports อ้างตามตำแหน่งคอลัมน์
+                else: rows = [[row.get(c, "") for c in SHEET_COLUMNS[name]] for row in df.to_dict("records")]
+                conn.execute(f"DELETE FROM {name.lower()}")
+                self._insert(conn, name, rows)
+        self._touch(*worksheet_names)
+        self.backfill_due_dates()
+        self.backfill_mission_reps()
+
+    def backfill_due_dates(self):
+        # parse due_date ของแถวเก่าครั้งเดียว แล้วเก็บลงคอลัมน์ (มี index ไว้ query ตามช่วงวัน)
+        conn = self._conn()
+        df = pd.read_sql_query('SELECT id, "topic", "desc" FROM missions WHERE "due_date" IS NULL OR "due_date" = \'\'', conn)
+        if df.empty: return 0
+        due_dates = format_due_dates(classify_mission_dates(df["topic"].astype(str) + " " + df["desc"].astype(str))["due_date"])
+        with conn: conn.executemany('UPDATE missions SET "due_date" = ? WHERE id = ?', zip(due_dates, df["id"].tolist()))
+        self._touch("Missions")
+        return len(df)
+
+    def backfill_mission_reps(self):
+        # Missions แถวเก่าที่ไม่มี Sales_Rep -> เติมจาก Assignments ลงคอลัมน์ (มี index) ครั้งเดียวตอนข้อมูลเข้า
+        # แทนการ merge ทุกครั้งที่ render (ลูกค้ามีหลายเซลล์ -> ใช้คนแรกใน Assignments)
+        conn = self._conn()
+        with conn:
+            n = conn.execute('''UPDATE missions SET "Sales_Rep" = (SELECT a."Sales_Rep" FROM assignments a WHERE a."Customer" = missions."Customer" ORDER BY a.id LIMIT 1)
+                                WHERE ("Sales_Rep" IS NULL OR "Sales_Rep" = '') AND "Customer" IN (SELECT "Customer" FROM assignments)''').rowcount
+        if n: self._touch("Missions")
+        return n
+
+    def load(self, worksheet_names):
+        # อ่านจาก DB เฉพาะตารางที่ version เปลี่ยน / DataFrame ใช้ร่วมกันทุก session (ห้ามแก้ในที่)
+        generation = reports_generation()
+        if generation != self.reports_generation:  # batch job จาก process อื่นแก้ Reports
+            self.reports_generation = generation
+            self._touch("Reports")
+        data = {}
+        for name in worksheet_names:
+            version = self.versions[name]  # อ่าน version ก่อน query (ถ้ามีคนเขียนระหว่างนี้ รอบหน้าจะ version ใหม่)
+            cached = self.frames.get(name)
+            if cached is None or cached[0] != version:
+                with timed("sqlite.load"):
+                    df = pd.read_sql_query(f"SELECT {quote_columns(SHEET_COLUMNS[name])} FROM {name.lower()} ORDER BY id", self._conn())
+                df.attrs["data_version"] = version
+                self.frames[name] = cached = (version, df)
+            data[name] = cached[1]
+        return data
+
+    def append(self, worksheet_name, row_data):
+        conn = self._conn()
+        with conn: self._insert(conn, worksheet_name, [row_data])
+        self._touch(worksheet_name)
+        if self.mirror_to_sheets: get_write_queue().enqueue(worksheet_name, row_data)
+
+    def delete_missions(self, customer_name):
+        conn = self._conn()
+        with conn: conn.execute('DELETE FROM missions WHERE "Customer" = ?', (customer_name,))
+        self._touch("Missions")
+        if self.mirror_to_sheets: get_write_queue().enqueue_delete("Missions", customer_name)
+
+    def close_visit(self, report_row, customer_name, followup_row=None):
+        # ทั้ง 3 ขั้นตอนอยู่ใน transaction เดียว: สำเร็จทั้งหมด หรือไม่บันทึกเลย
+        conn = self._conn()
+        with timed("sqlite.close_visit"), conn:
+            self._insert(conn, "Reports", [report_row])
+            conn.execute('DELETE FROM missions WHERE "Customer" = ?', (customer_name,))
+            if followup_row: self._insert(conn, "Missions", [followup_row])
+        self._touch("Reports", "Missions")
+        if self.mirror_to_sheets:
+            queue = get_write_queue()
+            queue.enqueue("Reports", report_row)
+            queue.enqueue_delete("Missions", customer_name)
+            if followup_row: queue.enqueue("Missions", followup_row)
+
+    def iter_report_pages(self, start_row, page_size):
+        conn = self._conn()
+        columns = quote_columns(SHEET_COLUMNS["Reports"])
+        while True:
+            rows = conn.execute(f"SELECT id, {columns} FROM reports WHERE id >= ? ORDER BY id LIMIT ?", (start_row, page_size)).fetchall()
+            if rows: yield [(row[0], ["" if v is None else v for v in row[1:]]) for row in rows]
+            if len(rows) < page_size: return
+            start_row = rows[-1][0] + 1
+
+    def update_report_sentiments(self, updates):
+        # แก้เฉพาะในเครื่อง (id ของ SQLite ไม่ตรงกับเลขแถวในชีต จึงไม่ mirror)
+        conn = self._conn()
+        with conn: conn.executemany('UPDATE reports SET "Sentiment" = ? WHERE id = ?', [(s, row_id) for row_id, s in updates.items()])
+        self._touch("Reports")
+        touch_reports_generation()
+        self.reports_generation = reports_generation()
+
+    def report_rows_from(self, cursor):
+        # cursor = id ของแถว (import จากชีตใหม่ -> id เปลี่ยน -> ผู้เรียกรู้ว่าต้องนับใหม่)
+        with timed("sqlite.report_rows"):
+            return pd.read_sql_query(f"SELECT id, {quote_columns(SHEET_COLUMNS['Reports'])} FROM reports WHERE id >= ? ORDER BY id",
+                                     self._conn(), params=(cursor or 0,), index_col="id")
+
+    def query_page(self, worksheet_name, filters, offset, limit):
+        # WHERE บนคอลัมน์ที่มี index + LIMIT/OFFSET -> ดึงขึ้นมาแค่หน้าที่เปิดอยู่
+        table = worksheet_name.lower()
+        clauses, params = [], []
+        for key, column in TABLE_FILTER_COLUMNS[worksheet_name].items():
+            if key != "date" and filters.get(key):
+                clauses.append(f'"{column}" = ?')
+                params.append(filters[key])
+        bounds = table_date_bounds(filters)
+        if bounds:
+            clauses.append(f'"{TABLE_FILTER_COLUMNS[worksheet_name]["date"]}" >= ? AND "{TABLE_FILTER_COLUMNS[worksheet_name]["date"]}" < ?')
+            params.extend(bounds)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        order = "id DESC" if worksheet_name in TABLE_NEWEST_FIRST else "id"
+        conn = self._conn()
+        with timed("sqlite.query_page"):
+            total = conn.execute(f"SELECT COUNT(*) FROM {table}{where}", params).fetchone()[0]
+            df = pd.read_sql_query(f"SELECT {quote_columns(SHEET_COLUMNS[worksheet_name])} FROM {table}{where} ORDER BY {order} LIMIT ? OFFSET ?", conn, params=params + [limit, offset])
+        return df, total
+
+    def invalidate(self):
+        # Assignments ดูแลในชีตโดยผู้จัดการ -> ดึงใหม่ทุกครั้งที่กด Refresh
+        if self.mirror_to_sheets: self.import_from_sheets(["Assignments"])
+
+@st.cache_resource
+def get_repository():
+    # STORAGE_BACKEND ใน secrets: "sheets" | "sqlite" (ไม่ระบุ = ใช้ชีตถ้ามี credentials ไม่งั้นใช้ SQLite แบบ offline)
+    backend = get_setting("STORAGE_BACKEND") or ("sheets" if has_sheets_credentials() else "sqlite")
+    if backend == "sqlite":
+        mirror = has_sheets_credentials() and get_bool_setting("SHEETS_MIRROR", True)
+        return SQLiteRepository(get_setting("SQLITE_PATH", SQLITE_PATH), mirror_to_sheets=mirror)
+    return SheetsRepository()
+
+# ==========================================
+# 1.3 DATA INDEX (rep -> ลูกค้า, (rep, ลูกค้า) -> missions) สร้างครั้งเดียวต่อ data version
+# ==========================================
+class DataIndex:
+    def __init__(self, df_assignments, df_missions):
+        has_assign_cols = {'Sales_Rep', 'Customer'} <= set(df_assignments.columns)
+        self.reps = df_assignments['Sales_Rep'].unique() if has_assign_cols else []
+        self.rep_customers = df_assignments.groupby('Sales_Rep', sort=False)['Customer'].unique().to_dict() if has_assign_cols else {}
+
+        # เก็บเป็นตำแหน่งแถว (iloc) ของ df_missions version เดียวกัน
+        self.has_mission_rep = 'Sales_Rep' in df_missions.columns
+        self.customer_missions, self.rep_customer_missions = {}, {}
+        if 'Customer' in df_missions.columns:
+            self.customer_missions = df_missions.groupby('Customer', sort=False).indices
+            if self.has_mission_rep: self.rep_customer_missions = df_missions.groupby(['Sales_Rep', 'Customer'], sort=False).indices
+
+        # ตารางงานค้างของผู้จัดการ: join rep ครั้งเดียวต่อ version (ชีตแบบเก่าที่ Missions ไม่มี Sales_Rep)
+        self.customers = df_assignments['Customer'].unique() if has_assign_cols else []
+        self.mission_statuses = df_missions['status'].dropna().unique() if 'status' in df_missions.columns else []
+        self.missions_with_rep = df_missions
+        if not self.has_mission_rep and has_assign_cols and 'Customer' in df_missions.columns:
+            self.missions_with_rep = pd.merge(df_missions, df_assignments[['Customer', 'Sales_Rep']], on='Customer', how='left')
+
+    def customers_of(self, rep):
+        return self.rep_customers.get(rep, [])
+
+    def mission_positions(self, rep, customer):
+        # Missions มี Sales_Rep -> กรองทั้งลูกค้าและเซลล์ / ชีตแบบเก่า -> กรองแค่ลูกค้า
+        if self.has_mission_rep: return self.rep_customer_missions.get((rep, customer), [])
+        return self.customer_missions.get(customer, [])
+
+DATA_INDEX_CACHE_SIZE = 8
+
+@st.cache_resource
+def get_data_index_cache():
+    return {}
+
+def get_data_index(df_assignments, df_missions):
+    key = (df_assignments.attrs.get("data_version"), df_missions.attrs.get("data_version"))
+    if None in key: return DataIndex(df_assignments, df_missions)  # ไม่รู้ version -> สร้างใหม่ทุกครั้ง
+    cache = get_data_index_cache()
+    data_index = cache.get(key)
+    if data_index is None:
+        with timed("index.build"): data_index = DataIndex(df_assignments, df_missions)
+        if len(cache) >= DATA_INDEX_CACHE_SIZE: cache.clear()
+        cache[key] = data_index
+    return data_index
+
+# ==========================================
+# 1.4 REPORT ANALYTICS (aggregate สะสมทีละแถวใหม่ ไม่คำนวณทั้งตารางทุกครั้ง)
+# ==========================================
+class ReportAggregates:
+    # Reports อ้างตามตำแหน่งคอลัมน์ (SHEET_COLUMNS["Reports"])
+    TIMESTAMP, REP, CUSTOMER, SENTIMENT = (SHEET_COLUMNS["Reports"].index(c) for c in ("Timestamp", "Sales_Rep", "Customer", "Sentiment"))
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, generation):
+        self.generation = generation
+        self.n_rows = 0
+        self.cursor = None                        # index (ตำแหน่ง/ id) ของแถวล่าสุดที่นับแล้ว
+        self.last_row = None
+        self.visits = collections.Counter()       # (rep, วันที่) -> จำนวนครั้งที่เข้าเยี่ยม
+        self.sentiments = collections.Counter()   # (ลูกค้า, sentiment) -> จำนวน
+        self.latency = {}                         # rep -> [จำนวน, รวมวัน, มากสุด] ของ "สร้าง follow-up -> ปิดงาน"
+        self.last_visit = {}                      # ลูกค้า -> เวลาที่เข้าเยี่ยมล่าสุด
+
+    def update(self, repository, generation):
+        # ต่อท้ายอย่างเดียว -> ขอจาก repository เฉพาะแถวตั้งแต่ cursor ลงไป แล้วบวกเฉพาะแถวใหม่
+        # แถวแรกที่ได้ต้องเป็นแถวเดิมที่นับไปแล้ว ถ้าหาย/ถูกแก้ (ลบชีต, import ใหม่) -> คำนวณใหม่ทั้งหมด
+        with self.lock:
+            if generation != self.generation: self._reset(generation)
+            rows = repository.report_rows_from(self.cursor)
+            if self.cursor is not None:
+                if rows.empty or rows.index[0] != self.cursor or tuple(rows.iloc[0].astype(str)) != self.last_row:
+                    self._reset(generation)
+                    rows = repository.report_rows_from(None)
+                else: rows = rows.iloc[1:]
+            if len(rows.columns) <= self.SENTIMENT or rows.empty: return self
+            with timed("analytics.update"): self._add(rows)
+            self.n_rows += len(rows)
+            self.cursor = rows.index[-1]
+            self.last_row = tuple(rows.iloc[-1].astype(str))
+        return self
+
+    def _add(self, new_rows):
+        ts = pd.to_datetime(new_rows.iloc[:, self.TIMESTAMP], errors="coerce")
+        reps = new_rows.iloc[:, self.REP].astype(str)
+        customers = new_rows.iloc[:, self.CUSTOMER].astype(str)
+        valid = ts.notna()
+        self.visits.update(pd.DataFrame({"rep": reps[valid], "day": ts[valid].dt.date}).value_counts().to_dict())
+        self.sentiments.update(pd.DataFrame({"customer": customers, "sentiment": new_rows.iloc[:, self.SENTIMENT].astype(str)}).value_counts().to_dict())
+
+        # ทุกครั้งที่ปิดงานจะสร้าง follow-up ของลูกค้านั้น -> งานนั้นปิดในการเยี่ยมครั้งถัดไป
+        # latency = ช่วงห่างระหว่างการเยี่ยมลูกค้าเดิม 2 ครั้งติดกัน (ครั้งแรกของแต่ละลูกค้าในชุดนี้ใช้ last_visit ที่จำไว้)
+        visits = pd.DataFrame({"ts": ts, "rep": reps, "customer": customers})[valid]
+        if visits.empty: return
+        previous = visits.groupby("customer")["ts"].shift(1)
+        previous = previous.fillna(pd.to_datetime(visits["customer"].map(self.last_visit)))
+        gaps = (visits["ts"] - previous).dt.total_seconds().div(86400).clip(lower=0)
+        stats = pd.DataFrame({"rep": visits["rep"], "days": gaps}).dropna().groupby("rep")["days"].agg(["count", "sum", "max"])
+        for rep, row in stats.iterrows():
+            entry = self.latency.setdefault(rep, [0, 0.0, 0.0])
+            entry[0] += int(row["count"])
+            entry[1] += row["sum"]
+            entry[2] = max(entry[2], row["max"])
+        self.last_visit.update(visits.groupby("customer")["ts"].last().to_dict())
+
+    def visits_frame(self, freq="D"):
+        # ตาราง rep x ช่วงเวลา (ขนาดขึ้นกับจำนวน rep/วัน ไม่ใช่จำนวนแถว)
+        with self.lock: items = list(self.visits.items())
+        if not items: return pd.DataFrame()
+        df = pd.DataFrame([(rep, pd.Timestamp(day), n) for (rep, day), n in items], columns=["Sales_Rep", "period", "visits"])
+        df["period"] = df["period"].dt.to_period(freq).dt.start_time.dt.date
+        return df.pivot_table(index="period", columns="Sales_Rep", values="visits", aggfunc="sum", fill_value=0).sort_index()
+
+    def sentiment_frame(self):
+        with self.lock: items = list(self.sentiments.items())
+        if not items: return pd.DataFrame()
+        df = pd.DataFrame([(c, s, n) for (c, s), n in items], columns=["Customer", "Sentiment", "n"])
+        return df.pivot_table(index="Customer", columns="Sentiment", values="n", aggfunc="sum", fill_value=0)
+
+    def latency_frame(self):
+        with self.lock: items = [(rep, *entry) for rep, entry in self.latency.items()]
+        df = pd.DataFrame(items, columns=["Sales_Rep", "closed", "total_days", "max_days"])
+        df["avg_days"] = (df["total_days"] / df["closed"]).round(1)
+        return df[["Sales_Rep", "closed", "avg_days", "max_days"]].round(1)
+
+@st.cache_resource
+def get_report_aggregates():
+    return ReportAggregates()
+
+# ==========================================
+# 1.5 PAGED TABLES (กรอง/แบ่งหน้าที่ฝั่ง server ส่งไป browser เฉพาะหน้าที่เปิดอยู่)
+# ==========================================
+TABLE_PAGE_SIZE = 50
+TABLE_ALL = "ทั้งหมด"
+TABLE_NEWEST_FIRST = ("Reports",)
+# ตัวกรอง -> คอลัมน์ (Reports: Status เป็น Completed ทุกแถว จึงกรอง "สถานะ" ด้วย Sentiment แทน)
+TABLE_FILTER_COLUMNS = {
+    "Missions": {"rep": "Sales_Rep", "customer": "Customer", "status": "status", "date": "due_date"},
+    "Reports": {"rep": "Sales_Rep", "customer": "Customer", "status": "Sentiment", "date": "Timestamp"},
+}
+
+def table_date_bounds(filters):
+    # เทียบแบบ string: วันที่เก็บเป็น YYYY-MM-DD... / "0" ตัดแถวที่ไม่มีวันที่ ("-") ออกเมื่อมีการกรองวัน
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    if not date_from and not date_to: return None
+    return (date_from.isoformat() if date_from else "0",
+            (date_to + datetime.timedelta(days=1)).isoformat() if date_to else "9")
+
+def table_column(df, worksheet_name, column):
+    # Reports ในชีตอ้างตามตำแหน่งคอลัมน์ / ตารางอื่นอ้างตามชื่อ header
+    if worksheet_name == "Reports":
+        pos = SHEET_COLUMNS["Reports"].index(column)
+        return df.columns[pos] if pos < len(df.columns) else None
+    return column if column in df.columns else None
+
+def filter_table(df, worksheet_name, filters):
+    mask = pd.Series(True, index=df.index)
+    for key, column in TABLE_FILTER_COLUMNS[worksheet_name].items():
+        column = table_column(df, worksheet_name, column)
+        if column is None: continue
+        if key == "date":
+            bounds = table_date_bounds(filters)
+            if bounds: mask &= df[column].astype(str).between(*bounds, inclusive="left")
+        elif filters.get(key): mask &= df[column].astype(str) == filters[key]
+    return df[mask]
+
+def show_table_page(worksheet_name, key, data_index, statuses):
+    c1, c2, c3, c4 = st.columns(4)
+    rep = c1.selectbox("Sales Rep", [TABLE_ALL, *data_index.reps], key=f"{key}_rep")
+    customers = data_index.customers if rep == TABLE_ALL else data_index.customers_of(rep)
+    customer = c2.selectbox("Customer", [TABLE_ALL, *customers], key=f"{key}_customer")
+    status = c3.selectbox("สถานะ", [TABLE_ALL, *statuses], key=f"{key}_status")
+    dates = c4.date_input("ช่วงวันที่", value=(), key=f"{key}_dates")
+    filters = {"rep": None if rep == TABLE_ALL else rep,
+               "customer": None if customer == TABLE_ALL else customer,
+               "status": None if status == TABLE_ALL else status,
+               "date_from": dates[0] if len(dates) > 0 else None,
+               "date_to": dates[1] if len(dates) > 1 else None}
+
+    # เปลี่ยนตัวกรอง -> กลับไปหน้าแรก
+    page_key = f"{key}_page"
+    if st.session_state.get(f"{key}_filters") != filters:
+        st.session_state[f"{key}_filters"] = filters
+        st.session_state[page_key] = 1
+    page = st.session_state.get(page_key, 1)
+    repository = get_repository()
+    df, total = repository.query_page(worksheet_name, filters, (page - 1) * TABLE_PAGE_SIZE, TABLE_PAGE_SIZE)
+    n_pages = max(1, -(-total // TABLE_PAGE_SIZE))
+    if page > n_pages:  # แถวหายไประหว่างเปิดหน้าอยู่ -> ไปหน้าสุดท้ายที่มีจริง
+        page = st.session_state[page_key] = n_pages
+        df, total = repository.query_page(worksheet_name, filters, (page - 1) * TABLE_PAGE_SIZE, TABLE_PAGE_SIZE)
+
+    st.dataframe(df, hide_index=True)
+    p1, p2 = st.columns([1, 3])
+    p1.number_input("หน้า", min_value=1, max_value=n_pages, key=page_key)
+    start = (page - 1) * TABLE_PAGE_SIZE
+    p2.caption(f"แถว {start + 1:,}–{start + len(df):,} จาก {total:,}" if total else "ไม่พบข้อมูล")
+
+def load_all_data(worksheet_names=APP_SHEETS):
+    return get_repository().load(tuple(worksheet_names))
+
+def append_data(worksheet_name, row_data):
+    try: get_repository().append(worksheet_name, row_data)
     except Exception as e: st.error(f"Save Error: {e}")
 
-def delete_mission_from_sheet(customer_name):
+def close_visit(report_row, customer_name, followup_row=None):
     try:
-        client = init_connection()
-        sheet = client.open(SHEET_NAME)
-        ws = sheet.worksheet("Missions")
-        data = ws.get_all_records()
-        rows_to_delete = [i + 2 for i, row in enumerate(data) if row.get('Customer') == customer_name]
-        for r in reversed(rows_to_delete): ws.delete_rows(r)
-        st.cache_data.clear()
-    except Exception as e: st.error(f"Delete Error: {e}")
+        get_repository().close_visit(report_row, customer_name, followup_row)
+        return True
+    except Exception as e:
+        st.error(f"Save Error: {e}")
+        return False
 
 # ==========================================
 # 2. UTILITIES (Date Parsing Fixed)
 # ==========================================
-def transcribe_audio(audio_bytes):
-    r = sr.Recognizer()
+ASR_SAMPLE_RATE = 16000  # mono 16 kHz 16-bit = รูปแบบที่ ASR ใช้อยู่แล้ว
+ASR_SAMPLE_WIDTH = 2
+ASR_DECODE_TIMEOUT_SEC = 60  # ffmpeg ค้าง -> kill ทิ้ง ไม่ให้กิน worker ถอดเสียงไปตลอด (เสียง 5 นาทีใช้ ~1.5s)
+
+def decode_audio_pcm(audio_bytes):
+    # ffmpeg ถอด + downmix เป็น mono + resample ใน pass เดียว -> PCM ดิบทาง stdout
+    # (ไม่ผ่าน AudioSegment -> WAV -> sr.AudioFile ที่ต้องก๊อป PCM ทั้งก้อนหลายรอบ)
+    cmd = [AudioSegment.converter, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+           "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(ASR_SAMPLE_RATE), "pipe:1"]
+    with timed("asr.decode"):
+        proc = subprocess.run(cmd, input=audio_bytes, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=ASR_DECODE_TIMEOUT_SEC)
+    if proc.returncode != 0 or not proc.stdout:
+        raise RuntimeError(proc.stderr.decode(errors="ignore").strip() or "ffmpeg decode failed")
+    return sr.AudioData(proc.stdout, ASR_SAMPLE_RATE, ASR_SAMPLE_WIDTH)
+
+# ==========================================
+# 2.1 ASR BACKENDS (ASR_BACKEND ใน secrets: "google" | "whisper" | "stub")
+# ==========================================
+class ASRBackend(abc.ABC):
+    name = "base"
+    note = ""
+
+    @abc.abstractmethod
+    def recognize(self, audio_data):
+        # คืนข้อความ / "" = ไม่มีคำพูด / raise sr.RequestError = ลองใหม่ได้
+        ...
+
+class GoogleASRBackend(ASRBackend):
+    name = "google"
+
+    def recognize(self, audio_data):
+        try: return sr.Recognizer().recognize_google(audio_data, language="th-TH")
+        except sr.UnknownValueError: return ""
+
+class WhisperASRBackend(ASRBackend):
+    # ถอดบน CPU ในเครื่อง ไม่ต้องพึ่ง network (ต้องติดตั้ง faster-whisper)
+    name = "whisper"
+
+    def __init__(self, model_size):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device="cpu", compute_type="int8", num_workers=ASR_CHUNK_WORKERS)
+
+    def recognize(self, audio_data):
+        pcm = audio_data.get_raw_data(convert_rate=ASR_SAMPLE_RATE, convert_width=ASR_SAMPLE_WIDTH)
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768
+        segments, _ = self.model.transcribe(samples, language="th", beam_size=1)
+        return "".join(segment.text for segment in segments).strip()
+
+class StubASRBackend(ASRBackend):
+    # สำหรับทดสอบ/รัน offline: คืนข้อความตายตัว
+    name = "stub"
+    note = "ไม่ได้ถอดเสียงจริง (latency = decode อย่างเดียว)"
+
+    def __init__(self, text):
+        self.text = text
+
+    def recognize(self, audio_data):
+        return self.text
+
+ASR_STUB_TEXT = "ลูกค้าสนใจ นัดคุยอีกครั้งพรุ่งนี้"
+
+def create_asr_backend(backend):
+    if backend == "stub": return StubASRBackend(get_setting("ASR_STUB_TEXT", ASR_STUB_TEXT))
+    if backend == "whisper": return WhisperASRBackend(get_setting("WHISPER_MODEL", "small"))
+    return GoogleASRBackend()
+
+@st.cache_resource
+def load_asr_backend(backend):
+    # โหลด model ครั้งเดียวต่อ process ต่อ backend (แอปกับ benchmark ใช้ instance เดียวกัน)
+    return create_asr_backend(backend)
+
+@st.cache_resource
+def get_asr_backend():
+    # whisper ใช้ไม่ได้ -> กลับไปใช้ google
+    backend = get_setting("ASR_BACKEND", "google")
+    try: return load_asr_backend(backend)
+    except Exception as e:
+        fallback = GoogleASRBackend()
+        fallback.note = f"{backend} ใช้ไม่ได้: {e}"
+        return fallback
+
+# วัด latency + WER/CER ต่อ backend: ไฟล์เสียง <ชื่อ>.webm/.wav คู่กับคำตอบที่ถูก <ชื่อ>.txt
+# ชุดมาตรฐานอยู่ใน repo (asr_samples/) / ชี้ไปชุดเสียงจริงจากภาคสนามได้ด้วย ASR_BENCHMARK_DIR ใน secrets
+# path สัมพัทธ์นับจากโฟลเดอร์ของ app.py (ไม่ขึ้นกับว่ารัน streamlit จากที่ไหน)
+ASR_BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), get_setting("ASR_BENCHMARK_DIR", "asr_samples"))
+ASR_BENCHMARK_BACKENDS = ("google", "whisper", "stub")
+
+def edit_distance(ref, hyp):
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i]
+        for j, h in enumerate(hyp, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h)))
+        prev = cur
+    return prev[-1]
+
+def load_asr_samples(sample_dir=ASR_BENCHMARK_DIR):
+    if not os.path.isdir(sample_dir): return []
+    samples = []
+    for file_name in sorted(os.listdir(sample_dir)):
+        stem, ext = os.path.splitext(file_name)
+        ref_path = os.path.join(sample_dir, stem + ".txt")
+        if ext == ".txt" or not os.path.exists(ref_path): continue
+        with open(ref_path, encoding="utf-8") as f: samples.append((os.path.join(sample_dir, file_name), f.read().strip()))
+    return samples
+
+def benchmark_asr(samples, backend_names=ASR_BENCHMARK_BACKENDS):
+    # ภาษาไทยไม่เว้นวรรคระหว่างคำ -> รายงาน CER (ตัวอักษร) คู่กับ WER (ตามช่องว่าง)
+    rows = []
+    for backend_name in backend_names:
+        try: backend = load_asr_backend(backend_name)
+        except Exception as e:
+            rows.append({"backend": backend_name, "samples": 0, "avg_ms": None, "wer": None, "cer": None, "note": str(e)})
+            continue
+        elapsed, word_errors, words, char_errors, chars, failed = 0.0, 0, 0, 0, 0, 0
+        for audio_path, reference in samples:
+            with open(audio_path, "rb") as f: audio_bytes = f.read()
+            start = time.perf_counter()
+            hypothesis = transcribe_audio(audio_bytes, backend)
+            elapsed += time.perf_counter() - start
+            if hypothesis is None: failed += 1  # decode/network error (นับเป็นผิดทั้งประโยค)
+            hypothesis = hypothesis or ""
+            word_errors += edit_distance(reference.split(), hypothesis.split())
+            words += len(reference.split())
+            char_errors += edit_distance(reference.replace(" ", ""), hypothesis.replace(" ", ""))
+            chars += len(reference.replace(" ", ""))
+        rows.append({
+            "backend": backend_name, "samples": len(samples),
+            "avg_ms": round(elapsed / max(len(samples), 1) * 1000, 1),
+            "wer": round(word_errors / max(words, 1), 3), "cer": round(char_errors / max(chars, 1), 3),
+            "note": "; ".join(filter(None, [backend.note, f"ถอดไม่สำเร็จ {failed}/{len(samples)}" if failed else ""]))
+        })
+    return pd.DataFrame(rows)
+
+# คลิปยาวตัดเป็นช่วงตามจังหวะเงียบ -> ถอดพร้อมกันทีละช่วง -> ต่อกลับตามลำดับ
+ASR_CHUNK_MAX_SEC = 30      # ยาวกว่านี้ต่อก้อน recognize_google ช้า/พังง่าย
+ASR_FRAME_MS = 30
+ASR_MIN_SILENCE_MS = 400    # เงียบนานเท่านี้ถึงนับเป็นจุดตัดได้
+ASR_SILENCE_DBFS = -40
+ASR_CHUNK_WORKERS = 4
+ASR_CHUNK_RETRIES = 2
+ASR_MISSING_CHUNK = "[…]"   # ช่วงที่ถอดไม่สำเร็จ (ได้ข้อความบางส่วน ดีกว่าหายทั้งคลิป)
+
+@st.cache_resource
+def get_asr_executor():
+    return ThreadPoolExecutor(max_workers=ASR_CHUNK_WORKERS, thread_name_prefix="asr-chunk")
+
+def split_audio_on_silence(audio_data, max_sec=ASR_CHUNK_MAX_SEC):
+    # Energy-based VAD บน PCM 16-bit: คืน list ของ sr.AudioData (ตัดช่วงที่เงียบล้วนทิ้ง)
+    samples = np.frombuffer(audio_data.frame_data, dtype="<i2")
+    rate = audio_data.sample_rate
+    frame = max(1, rate * ASR_FRAME_MS // 1000)
+    n_frames = len(samples) // frame
+    if n_frames == 0: return []
+    frames = samples[:n_frames * frame].reshape(n_frames, frame).astype(np.float32)
+    dbfs = 20 * np.log10(np.sqrt((frames ** 2).mean(axis=1)) / 32768 + 1e-9)
+    silent = dbfs < ASR_SILENCE_DBFS
+
+    # จุดตัด = กลางช่วงเงียบที่ยาวพอ
+    cuts = []
+    min_run = max(1, ASR_MIN_SILENCE_MS // ASR_FRAME_MS)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], silent.astype(np.int8), [0]))))
+    for run_start, run_end in zip(edges[::2], edges[1::2]):
+        if run_end - run_start >= min_run: cuts.append((run_start + run_end) // 2 * frame)
+
+    bounds, start, total, max_len = [], 0, len(samples), int(max_sec * rate)
+    while total - start > max_len:
+        candidates = [c for c in cuts if start < c <= start + max_len]
+        end = candidates[-1] if candidates else start + max_len  # ไม่มีช่วงเงียบเลย -> ตัดตรงความยาวสูงสุด
+        bounds.append((start, end))
+        start = end
+    bounds.append((start, total))
+
+    width = audio_data.sample_width
+    return [
+        sr.AudioData(audio_data.frame_data[s * width:e * width], rate, width)
+        for s, e in bounds if not silent[s // frame:max(s // frame + 1, e // frame)].all()
+    ]
+
+def recognize_chunk(audio_data, backend):
+    for attempt in range(ASR_CHUNK_RETRIES + 1):
+        try:
+            with timed(f"asr.{backend.name}"): return backend.recognize(audio_data)
+        except sr.RequestError:
+            if attempt == ASR_CHUNK_RETRIES: raise
+            time.sleep(0.5 * 2 ** attempt)
+
+def transcribe_audio(audio_bytes, backend=None):
     try:
-        audio_segment = AudioSegment.from_file(io.BytesIO(audio_bytes))
-        wav_io = io.BytesIO()
-        audio_segment.export(wav_io, format="wav")
-        wav_io.seek(0)
-        with sr.AudioFile(wav_io) as source:
-            audio_data = r.record(source)
-            text = r.recognize_google(audio_data, language="th-TH")
-            return text
+        backend = backend or get_asr_backend()
+        chunks = split_audio_on_silence(decode_audio_pcm(audio_bytes))
+        futures = [get_asr_executor().submit(recognize_chunk, chunk, backend) for chunk in chunks]
+        parts = []
+        for future in futures:
+            try: parts.append(future.result())
+            except Exception: parts.append(ASR_MISSING_CHUNK)
+        if all(part in ("", ASR_MISSING_CHUNK) for part in parts): return None
+        return " ".join(part for part in parts if part)
     except: return None
 
+# ถอดเสียงใน worker pool (ไม่บล็อก script) / หลาย session ถอดพร้อมกันได้
+TRANSCRIBE_WORKERS = 4
+TRANSCRIBE_POLL_SEC = 1.0
+TRANSCRIBE_JOB_TTL_SEC = 600  # งานที่เสร็จแล้วแต่ไม่มีใครมารับ (ปิดหน้าไปแล้ว) เก็บไว้นานสุดเท่านี้
+TRANSCRIPT_CACHE_SIZE = 128   # จำนวนเสียง (digest) ที่จำผลถอด/สรุปไว้ แชร์ทุก session
+
+def audio_digest(audio_bytes):
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+class TranscriptionJobs:
+    # job id = digest ของเสียง: เสียงเดิม (reset session / อีก tab) ไม่ถอดซ้ำ และไม่ต้องเก็บ bytes ใน session
+    def __init__(self, workers, cache_size):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asr")
+        self.lock = threading.Lock()
+        self.jobs = {}  # digest -> (future, submitted_at)
+        self.cache_size = cache_size
+        self.entries = collections.OrderedDict()  # digest -> {"transcript", "summaries": {ลูกค้า: สรุป}} (LRU)
+
+    def submit(self, audio_bytes):
+        digest = audio_digest(audio_bytes)
+        with self.lock:
+            now = time.time()
+            for old_digest, (old_future, submitted_at) in list(self.jobs.items()):
+                if old_future.done() and now - submitted_at > TRANSCRIBE_JOB_TTL_SEC: del self.jobs[old_digest]
+            # เคยถอดแล้ว / กำลังถอดอยู่ -> ใช้งานเดิม
+            if digest not in self.entries and digest not in self.jobs:
+                self.jobs[digest] = (self.executor.submit(self._run, digest, audio_bytes, get_asr_backend()), now)
+        return digest
+
+    def _run(self, digest, audio_bytes, backend):
+        with timed("asr.transcribe"): transcript = transcribe_audio(audio_bytes, backend)
+        if transcript:
+            with self.lock:
+                self.entries[digest] = {"transcript": transcript, "summaries": {}}
+                while len(self.entries) > self.cache_size: self.entries.popitem(last=False)
+        return transcript
+
+    def done(self, digest):
+        with self.lock: job = self.jobs.get(digest)
+        return job is None or job[0].done()
+
+    def pop(self, digest):
+        # คืนข้อความที่ถอดได้ (None = ถอดไม่ได้ / ไม่มีงานนี้) / งานที่เสร็จแล้วย้ายไปอยู่ใน cache
+        with self.lock:
+            self.jobs.pop(digest, None)
+            entry = self.entries.get(digest)
+            if entry is None: return None
+            self.entries.move_to_end(digest)
+            return entry["transcript"]
+
+    def cached_summary(self, digest, customer):
+        with self.lock: return (self.entries.get(digest) or {}).get("summaries", {}).get(customer)
+
+    def remember_summary(self, digest, customer, summary):
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None: entry["summaries"][customer] = summary
+
+@st.cache_resource
+def get_transcription_jobs():
+    return TranscriptionJobs(TRANSCRIBE_WORKERS, TRANSCRIPT_CACHE_SIZE)
+
+@st.fragment(run_every=TRANSCRIBE_POLL_SEC)
+def wait_for_transcription(job_id):
+    # rerun เฉพาะ fragment นี้ทุก TRANSCRIBE_POLL_SEC / เสร็จแล้วค่อย rerun ทั้งหน้าไปทำสรุปต่อ
+    if get_transcription_jobs().done(job_id): st.rerun()
+    st.caption("⏳ กำลังถอดเสียง...")
+
 # ==========================================
 # [FIXED] ฟังก์ชันแยกแยะวันที่ (รองรับปี 2 หลัก + เวลาไทย)
 # ==========================================
-def get_task_status_by_date(topic_str):
-    try:
-        if not isinstance(topic_str, str): return 'today'
-        
-        # 1. ตั้งค่า "วันนี้" เป็นเวลาไทย (GMT+7)
-        tz = datetime.timezone(datetime.timedelta(hours=7))
-        today = datetime.datetime.now(tz).date()
-        
-        # 2. หา Pattern ตัวเลข (รองรับปี 2-4 หลัก)
-        # จับรูปแบบ: d/m/yy หรือ d-m-yy (เช่น 27/11/68, 27-11-2568)
-        match_digit = re.search(r"(\d{1,2})\s*[\/\-]\s*(\d{1,2})\s*[\/\-]\s*(\d{2,4})", topic_str)
-        
-        if match_digit:
-            d, m, y = map(int, match_digit.groups())
-            
-            # Logic แปลงปี:
-            if y > 2400: 
-                # กรณีปีเต็ม พ.ศ. (2568) -> ลบ 543 เป็น ค.ศ.
-                y -= 543
-            elif y < 100: 
-                # กรณีปีย่อ (68) -> ตีว่าเป็น พ.ศ. 25xx -> บวก 1957 เป็น ค.ศ. (2500-543=1957)
-                # (เช่น 68 + 1957 = 2025)
-                # แต่ถ้าเลขน้อยๆ เช่น 25 อาจจะเป็น ค.ศ. 2025 ก็ได้ (กันเหนียว)
-                if y > 40: y += 1957 
-                else: y += 2000
-            
-            try:
-                task_date = datetime.date(y, m, d)
-                # เทียบกับวันนี้
-                return 'future' if task_date > today else 'today'
-            except:
-                return 'today'
-
-        # 3. หา Pattern ภาษาไทย (เหมือนเดิม)
-        match_thai = re.search(r"(\d{1,2})\s+([ก-๙.]+)", topic_str)
-        if match_thai:
-            day = int(match_thai.group(1))
-            month_str = match_thai.group(2)
-            thai_months = {"ม.ค.":1,"มกราคม":1,"ก.พ.":2,"กุมภาพันธ์":2,"มี.ค.":3,"มีนาคม":3,"เม.ย.":4,"เมษายน":4,"พ.ค.":5,"พฤษภาคม":5,"มิ.ย.":6,"มิถุนายน":6,"ก.ค.":7,"กรกฎาคม":7,"ส.ค.":8,"สิงหาคม":8,"ก.ย.":9,"กันยายน":9,"ต.ค.":10,"ตุลาคม":10,"พ.ย.":11,"พฤศจิกายน":11,"ธ.ค.":12,"ธันวาคม":12}
-            month = 0
-            for k,v in thai_months.items():
-                if k in month_str: month = v; break
-            
-            if month > 0:
-                year = today.year
-                if month < today.month: year += 1
-                try:
-                    task_date = datetime.date(year, month, day)
-                    return 'future' if task_date > today else 'today'
-                except: return 'today'
-                
-        return 'today'
-    except: return 'today'
+THAI_TZ = datetime.timezone(datetime.timedelta(hours=7))
+
+# จับรูปแบบ: d/m/yy หรือ d-m-yy (เช่น 27/11/68, 27-11-2568)
+DATE_DIGIT_PATTERN = re.compile(r"(\d{1,2})\s*[\/\-]\s*(\d{1,2})\s*[\/\-]\s*(\d{2,4})")
+# จับรูปแบบ: วัน + ชื่อเดือนไทย (เช่น 7 ธ.ค., 15 มกราคม)
+DATE_THAI_PATTERN = re.compile(r"(\d{1,2})\s+([ก-๙.]+)")
+THAI_MONTHS = {"ม.ค.":1,"มกราคม":1,"ก.พ.":2,"กุมภาพันธ์":2,"มี.ค.":3,"มีนาคม":3,"เม.ย.":4,"เมษายน":4,"พ.ค.":5,"พฤษภาคม":5,"มิ.ย.":6,"มิถุนายน":6,"ก.ค.":7,"กรกฎาคม":7,"ส.ค.":8,"สิงหาคม":8,"ก.ย.":9,"กันยายน":9,"ต.ค.":10,"ตุลาคม":10,"พ.ย.":11,"พฤศจิกายน":11,"ธ.ค.":12,"ธันวาคม":12}
+
+def thai_today():
+    # "วันนี้" ตามเวลาไทย (GMT+7)
+    return datetime.datetime.now(THAI_TZ).date()
+
+def classify_mission_dates(texts, today=None):
+    # แยกวันที่ทั้งคอลัมน์ในครั้งเดียว -> DataFrame[due_date, is_future] (index ตรงกับ texts)
+    today = today or thai_today()
+    texts = pd.Series(texts).astype(str)
+
+    # 1. Pattern ตัวเลข (ถ้าเจอแต่วันที่ไม่ถูกต้อง = ไม่มีกำหนด ไม่ไปดู pattern ไทยต่อ)
+    digit = texts.str.extract(DATE_DIGIT_PATTERN).astype(float)
+    has_digit = digit[0].notna()
+    y = digit[2]
+    # ปีเต็ม พ.ศ. (2568) -> -543 / ปีย่อ (68) -> พ.ศ. 25xx (+1957) แต่ถ้า <= 40 ถือเป็น ค.ศ. 20xx
+    y = y.mask(y > 2400, y - 543).mask(y < 100, (y + 1957).where(y > 40, y + 2000))
+    digit_dates = pd.to_datetime(pd.DataFrame({"year": y, "month": digit[1], "day": digit[0]}), errors="coerce")
+
+    # 2. Pattern ภาษาไทย (เฉพาะแถวที่ไม่เจอตัวเลข): ปีนี้ หรือปีหน้าถ้าเดือนผ่านไปแล้ว
+    thai = texts[~has_digit].str.extract(DATE_THAI_PATTERN)
+    month_names = thai[1].dropna().unique()  # ชื่อเดือนที่ไม่ซ้ำมีไม่กี่แบบ -> map ทีละค่าแทนทีละแถว
+    month_lookup = {name: next((v for k, v in THAI_MONTHS.items() if k in name), np.nan) for name in month_names}
+    month = thai[1].map(month_lookup).astype(float)
+    year = today.year + (month < today.month).astype(int)
+    thai_dates = pd.to_datetime(pd.DataFrame({"year": year, "month": month, "day": thai[0].astype(float)}), errors="coerce")
+
+    due_date = digit_dates.where(has_digit, thai_dates.reindex(texts.index))
+    return pd.DataFrame({"due_date": due_date, "is_future": due_date > pd.Timestamp(today)}, index=texts.index)
+
+# หัวข้อโจทย์ในสรุป ("- **[topic]**:") และ prefix "Follow up <วันที่>" ของงานเดิม -> วันที่ในนั้นไม่ใช่วันนัดใหม่
+REPORT_HEADING_PATTERN = re.compile(r"\*\*[^*\n]*\*\*\s*:?")
+FOLLOWUP_PREFIX_PATTERN = re.compile(r"Follow up\s*\d{1,2}\s*[\/\-]\s*\d{1,2}\s*[\/\-]\s*\d{2,4}", re.IGNORECASE)
+
+def strip_report_headings(report_text):
+    text = REPORT_HEADING_PATTERN.sub(" ", str(report_text or ""))
+    return FOLLOWUP_PREFIX_PATTERN.sub(" ", text)
+
+NO_DUE_DATE = "-"   # parse แล้วแต่ไม่เจอวันที่ (ต่างจากช่องว่าง = ยังไม่เคย parse)
+
+def format_due_dates(due_dates):
+    return due_dates.dt.strftime("%Y-%m-%d").fillna(NO_DUE_DATE)
+
+def parse_due_date(text):
+    # ใช้ตอนสร้าง mission: เก็บ due_date เป็นคอลัมน์จริง (YYYY-MM-DD) จะได้ไม่ต้อง parse ทุก rerun
+    return format_due_dates(classify_mission_dates([text])["due_date"]).iloc[0]
+
+def mission_due_dates(df_missions):
+    # อ่าน due_date ที่บันทึกไว้ แถวไหนยังไม่มี (ยังไม่ backfill) ค่อย parse จาก topic/desc
+    stored = df_missions["due_date"] if "due_date" in df_missions.columns else pd.Series("", index=df_missions.index)
+    stored = stored.fillna("").astype(str)
+    missing = stored == ""
+    if missing.any():
+        subset = df_missions[missing]
+        parsed = classify_mission_dates(subset['topic'].astype(str) + " " + subset['desc'].astype(str))["due_date"]
+        stored = stored.where(~missing, format_due_dates(parsed))
+    return stored
 
 # ==========================================
 # 3. AI LOGIC (Groq)
 # ==========================================
 
+# 3.0 LLM Response Cache (key = model + prompt + temperature + วันที่) -> memory LRU + disk (TTL)
+LLM_CACHE_PATH = os.path.join(LOCAL_DATA_DIR, "llm_cache.db")
+LLM_CACHE_MEMORY_SIZE = 256
+LLM_CACHE_TTL_SEC = 24 * 60 * 60
+
+class LLMResponseCache:
+    def __init__(self, db_path, memory_size, ttl):
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.memory = collections.OrderedDict()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "bypass": 0}
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        with self.db:
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, response TEXT, created_at REAL)")
+            self.db.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - ttl,))
+
+    @staticmethod
+    def make_key(**request):
+        return hashlib.sha256(json.dumps(request, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def count(self, stat):
+        with self.lock: self.stats[stat] += 1
+
+    def _remember(self, key, response):
+        self.memory[key] = response
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size: self.memory.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self.memory[key]
+            row = self.db.execute("SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row and time.time() - row[1] <= self.ttl:
+                self._remember(key, row[0])
+                self.stats["disk_hits"] += 1
+                return row[0]
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, response):
+        with self.lock:
+            self._remember(key, response)
+            with self.db: self.db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, response, time.time()))
+
+    def snapshot(self):
+        with self.lock: return dict(self.stats)
+
+@st.cache_resource
+def get_llm_cache():
+    return LLMResponseCache(LLM_CACHE_PATH, LLM_CACHE_MEMORY_SIZE, LLM_CACHE_TTL_SEC)
+
+# ==========================================
+# 3.0.1 GROQ GATEWAY (client เดียวทั้ง process + token bucket + retry)
+# ==========================================
+# โควต้าต่อนาทีของแต่ละ model: (requests, tokens) / ปรับตาม plan ได้ที่ secrets GROQ_RPM, GROQ_TPM
+GROQ_RATE_LIMITS = {
+    "llama-3.3-70b-versatile": (30, 12000),
+    "llama-3.1-8b-instant": (30, 6000),
+}
+GROQ_DEFAULT_RATE_LIMIT = (30, 6000)
+GROQ_MAX_RETRIES = 4
+GROQ_BACKOFF_BASE_SEC = 0.5
+GROQ_BACKOFF_MAX_SEC = 20
+GROQ_DEFAULT_COMPLETION_TOKENS = 512  # ไว้ประมาณ token ตอนไม่ได้กำหนด max_tokens
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        # จองก่อนแล้วคืนเวลาที่ต้องรอ (ติดลบได้ = คิวตามลำดับการจอง)
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= min(amount, self.capacity)
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(self, amount):
+        # ใช้จริงต่างจากที่ประมาณไว้ -> ชดเชย
+        with self.lock: self.tokens -= amount
+
+def is_retryable_llm_error(e):
+    if isinstance(e, APIConnectionError): return True  # รวม timeout
+    return isinstance(e, APIStatusError) and (e.status_code == 429 or e.status_code >= 500)
+
+class GroqGateway:
+    def __init__(self, api_key):
+        # max_retries=0: retry/backoff ทำเองด้านล่าง (นับ metrics ได้) / client เดียว = ใช้ connection pool (keep-alive) ร่วมกัน
+        self.client = Groq(api_key=api_key, max_retries=0)
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "server_errors": 0, "failed": 0, "queued": 0, "queue_wait_sec": 0.0}
+
+    def _buckets(self, model):
+        with self.lock:
+            if model not in self.buckets:
+                rpm, tpm = GROQ_RATE_LIMITS.get(model, GROQ_DEFAULT_RATE_LIMIT)
+                self.buckets[model] = (TokenBucket(get_number_setting("GROQ_RPM", rpm)), TokenBucket(get_number_setting("GROQ_TPM", tpm)))
+            return self.buckets[model]
+
+    def _count(self, key, amount=1):
+        with self.lock: self.stats[key] += amount
+
+    def create(self, **kwargs):
+        requests_bucket, tokens_bucket = self._buckets(kwargs["model"])
+        # ประมาณ token: prompt (~2 ตัวอักษร/token) + ความยาวคำตอบสูงสุด
+        estimate = sum(len(m["content"]) for m in kwargs["messages"]) // 2 + (kwargs.get("max_tokens") or GROQ_DEFAULT_COMPLETION_TOKENS)
+        wait = max(requests_bucket.reserve(1), tokens_bucket.reserve(estimate))
+        if wait > 0:
+            self._count("queued")
+            self._count("queue_wait_sec", wait)
+            with timed("groq.queue_wait"): time.sleep(wait)
+
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            try:
+                self._count("requests")
+                response = self.client.chat.completions.create(**kwargs)
+                break
+            except Exception as e:
+                if not is_retryable_llm_error(e) or attempt == GROQ_MAX_RETRIES:
+                    self._count("failed")
+                    raise
+                status = getattr(e, "status_code", None)
+                self._count("rate_limited" if status == 429 else "server_errors")
+                self._count("retries")
+                # Exponential backoff + full jitter / ถ้า server บอก retry-after มาก็รออย่างน้อยเท่านั้น
+                delay = random.uniform(0, min(GROQ_BACKOFF_MAX_SEC, GROQ_BACKOFF_BASE_SEC * 2 ** attempt))
+                retry_after = getattr(getattr(e, "response", None), "headers", {}).get("retry-after")
+                try: delay = max(delay, float(retry_after))
+                except (TypeError, ValueError): pass
+                with timed("groq.backoff"): time.sleep(delay)
+
+        usage = getattr(response, "usage", None)
+        if usage and getattr(usage, "total_tokens", None): tokens_bucket.adjust(usage.total_tokens - estimate)
+        return response
+
+    def snapshot(self):
+        with self.lock: return dict(self.stats, queue_wait_sec=round(self.stats["queue_wait_sec"], 2))
+
+@st.cache_resource
+def get_groq_gateway():
+    return GroqGateway(st.secrets["GROQ_API_KEY"])
+
+def _llm_request(model, prompt, temperature, max_tokens, response_format, cache_nondeterministic):
+    # temperature > 0 ให้ผลไม่เหมือนเดิมทุกครั้ง -> ไม่ cache เว้นแต่ผู้เรียกยอมรับ (cache_nondeterministic=True)
+    cache = get_llm_cache()
+    use_cache = temperature == 0 or cache_nondeterministic
+    key = cache.make_key(model=model, prompt=prompt, temperature=temperature, max_tokens=max_tokens,
+                         response_format=response_format, date=thai_today().isoformat())
+    cached = None
+    if use_cache: cached = cache.get(key)
+    else: cache.count("bypass")
+    kwargs = {"model": model, "messages": [{"role": "user", "content": prompt}], "temperature": temperature}
+    if max_tokens: kwargs["max_tokens"] = max_tokens
+    if response_format: kwargs["response_format"] = response_format
+    return cache, (key if use_cache else None), cached, kwargs
+
+def llm_complete(model, prompt, temperature, max_tokens=None, response_format=None, cache_nondeterministic=False):
+    cache, key, cached, kwargs = _llm_request(model, prompt, temperature, max_tokens, response_format, cache_nondeterministic)
+    if cached is not None: return cached
+
+    with timed(f"llm.{model}"): completion = get_groq_gateway().create(**kwargs)
+    content = completion.choices[0].message.content
+    if key: cache.put(key, content)
+    return content
+
+# ค่าเริ่มต้น = stream: สรุปขึ้นจอทันที แล้วค่อยตรวจวันนัด + sentiment ด้วย assess_report (รวม 2 call)
+# False = รอสรุปเต็มก่อนแสดง แต่ได้ทุกอย่างใน call เดียว (analyze_voice_report)
+LLM_STREAMING = get_bool_setting("LLM_STREAMING", True)
+
+def llm_stream(model, prompt, temperature, max_tokens=None, cache_nondeterministic=False):
+    # เหมือน llm_complete แต่ทยอย yield ทีละ token (ใช้กับ st.write_stream) / ใช้ cache ชุดเดียวกัน
+    cache, key, cached, kwargs = _llm_request(model, prompt, temperature, max_tokens, None, cache_nondeterministic)
+    if cached is not None:
+        yield cached
+        return
+
+    stats, parts = get_latency_stats(), []
+    start = time.perf_counter()
+    with timed(f"llm.{model}"):
+        for chunk in get_groq_gateway().create(stream=True, **kwargs):
+            token = chunk.choices[0].delta.content if chunk.choices else None
+            if not token: continue
+            # Time-to-first-token: เวลาที่ผู้ใช้รอจนเห็นตัวอักษรแรก
+            if not parts: stats.record(f"llm.{model}.ttft", time.perf_counter() - start)
+            parts.append(token)
+            yield token
+    if key: cache.put(key, "".join(parts))
+
 # 3.1 สรุปความ (จับคู่โจทย์ + สั้นกระชับ)
 # ==========================================
 # 3.1 สรุปความ (Smart Mapping - แสดงเฉพาะสิ่งที่พูด)
 # ==========================================
-def summarize_voice_report(raw_text, customer_name, mission_df):
-    try:
-        if "GROQ_API_KEY" not in st.secrets: return raw_text
-        client = Groq(api_key=st.secrets["GROQ_API_KEY"])
-        
-        # เตรียมรายการโจทย์
-        if not mission_df.empty:
-            tasks_text = "\n".join([f"- {row['topic']}" for _, row in mission_df.iterrows()])
-        else:
-            tasks_text = "ไม่มีโจทย์พิเศษ"
+def build_summary_prompt(raw_text, customer_name, mission_df):
+    # เตรียมรายการโจทย์
+    if not mission_df.empty:
+        tasks_text = "\n".join([f"- {row['topic']}" for _, row in mission_df.iterrows()])
+    else:
+        tasks_text = "ไม่มีโจทย์พิเศษ"
 
-        prompt = f"""
+    prompt = f"""
         Role: AI สรุปรายงานการขายที่ "เนื้อๆ เน้นๆ"
         Input: "{raw_text}"
         
@@ -658,16 +2109,34 @@ def summarize_voice_report(raw_text, customer_name, mission_df):
         
         4. **ห้าม** ใส่คำว่า "อื่นๆ: ไม่มีข้อมูล" หรือสรุปจบใดๆ เอาแค่เนื้อหาที่จับคู่ได้เท่านั้น
         """
-        
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile", # ใช้ตัวฉลาดสุดเพื่อการจับคู่ที่แม่นยำ
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1, 
-            max_tokens=300
-        )
-        return completion.choices[0].message.content
+    return prompt
+
+SUMMARY_LLM = {
+    "model": "llama-3.3-70b-versatile", # ใช้ตัวฉลาดสุดเพื่อการจับคู่ที่แม่นยำ
+    "temperature": 0.1,
+    "max_tokens": 300,
+    "cache_nondeterministic": True  # เสียงเดิม + โจทย์เดิม ใช้สรุปเดิมได้
+}
+
+def summarize_voice_report(raw_text, customer_name, mission_df):
+    try:
+        if "GROQ_API_KEY" not in st.secrets: return raw_text
+        return llm_complete(prompt=build_summary_prompt(raw_text, customer_name, mission_df), **SUMMARY_LLM)
     except: return raw_text
 
+def stream_voice_report(raw_text, customer_name, mission_df):
+    # แบบ streaming: error ก่อนได้ token แรก -> คืนข้อความดิบเหมือน summarize_voice_report
+    streamed = False
+    try:
+        if "GROQ_API_KEY" not in st.secrets:
+            yield raw_text
+            return
+        for token in llm_stream(prompt=build_summary_prompt(raw_text, customer_name, mission_df), **SUMMARY_LLM):
+            streamed = True
+            yield token
+    except Exception:
+        if not streamed: yield raw_text
+
 # 3.2 Auto-Followup (คำนวณวันพรุ่งนี้ + Format หัวข้อเป๊ะๆ)
 # ==========================================
 # ==========================================
@@ -676,21 +2145,62 @@ def summarize_voice_report(raw_text, customer_name, mission_df):
 # ==========================================
 # 3.2 Auto-Followup (Strict Logic: No Date = Next Month)
 # ==========================================
+# Helper: แปลงเป็นสตริงไทยแบบย่อ (d/m/yy)
+def to_short_thai_date(dt):
+    year_short = str(dt.year + 543)[-2:] 
+    return f"{dt.day}/{dt.month}/{year_short}"
+
+def next_month_of(dt):
+    # เดือนหน้า วันเดียวกัน (วันที่ไม่มีในเดือนหน้า เช่น 31 -> 28)
+    try:
+        return dt.replace(month=dt.month+1)
+    except ValueError:
+        if dt.month == 12: return dt.replace(year=dt.year+1, month=1)
+        return dt.replace(month=dt.month+1, day=28)
+
+FOLLOWUP_TOMORROW_PATTERN = re.compile(r"พรุ่งนี้")
+FOLLOWUP_WEEKDAY_PATTERN = re.compile(r"วัน(จันทร์|อังคาร|พุธ|พฤหัส|ศุกร์|เสาร์|อาทิตย์)(?:บดี)?\s*(?:หน้า|นี้)")
+# "เมื่อวันจันทร์...", "...ที่แล้ว", "...ที่ผ่านมา" ใกล้ๆ คำบอกเวลา = เล่าเรื่องที่ผ่านมา ไม่ใช่วันนัด
+PAST_REFERENCE_PATTERN = re.compile(r"เมื่อ|ที่แล้ว|ที่ผ่านมา")
+PAST_REFERENCE_WINDOW = 12  # ตัวอักษรก่อน/หลังคำบอกเวลาที่ดู
+
+def is_past_reference(text, match):
+    return bool(PAST_REFERENCE_PATTERN.search(text, max(0, match.start() - PAST_REFERENCE_WINDOW), match.end() + PAST_REFERENCE_WINDOW))
+FOLLOWUP_NEXT_MONTH_PATTERN = re.compile(r"(?<!ต้น)(?<!กลาง)(?<!ปลาย)(?<!สิ้น)เดือนหน้า")
+THAI_WEEKDAYS = ["จันทร์", "อังคาร", "พุธ", "พฤหัส", "ศุกร์", "เสาร์", "อาทิตย์"]
+
+def resolve_followup_date(report_text, today=None):
+    # กฎเดียวกับ STEP 1 ใน prompt ของ create_followup_mission แต่คิดในเครื่อง
+    # คืน date / None = มีคำบอกเวลาที่กฎไม่รู้จัก (เช่น สัปดาห์หน้า, ต้นเดือนหน้า) -> ให้ AI ตัดสิน
+    today = today or thai_today()
+    text = strip_report_headings(report_text)  # วันที่ในหัวข้อโจทย์ = วันของงานเดิม
+    # 1. วันที่ชัดเจน (d/m/yy, 7 ธ.ค.) ที่ยังมาไม่ถึง / วันที่ผ่านไปแล้ว = ไม่ใช่วันนัด ข้ามไปกฎถัดไป
+    explicit = classify_mission_dates([text], today)["due_date"].iloc[0]
+    if pd.notna(explicit) and explicit.date() > today: return explicit.date()
+    # 2. พรุ่งนี้
+    if FOLLOWUP_TOMORROW_PATTERN.search(text): return today + datetime.timedelta(days=1)
+    # 3. วัน...หน้า/นี้ -> วันนั้นที่ใกล้ที่สุดภายใน 7 วันข้างหน้า (ตามโพยปฏิทิน) / วันที่เล่าย้อนหลังไม่นับ
+    weekday = next((m for m in FOLLOWUP_WEEKDAY_PATTERN.finditer(text) if not is_past_reference(text, m)), None)
+    if weekday:
+        days_ahead = (THAI_WEEKDAYS.index(weekday.group(1)) - today.weekday() - 1) % 7 + 1
+        return today + datetime.timedelta(days=days_ahead)
+    # 4. เดือนหน้า / ไม่เจอเวลาเลย -> เดือนหน้า (Default) / คำกวมๆ, วันเฉยๆ, เล่าย้อนหลัง -> ให้ AI ตัดสิน
+    has_time = APPOINTMENT_TIME_PATTERN.search(text) or APPOINTMENT_WEAK_TIME_PATTERN.search(text)
+    if FOLLOWUP_NEXT_MONTH_PATTERN.search(text) or not has_time: return next_month_of(today)
+    return None
+
 def create_followup_mission(customer, report_text, original_topic):
     try:
-        client = Groq(api_key=st.secrets["GROQ_API_KEY"])
-        
+        # 0. ส่วนใหญ่ตัดสินได้ด้วยกฎ (ไม่ต้องรอ network) / เหลือแต่เคสที่กฎไม่รู้จักค่อยถาม AI
+        target_date = resolve_followup_date(report_text)
+        if target_date:
+            return {"create": True, "topic": f"Follow up {to_short_thai_date(target_date)} {customer}: {original_topic}", "desc": report_text, "status": "pending"}
+
         # 1. คำนวณเวลาไทย (GMT+7)
-        tz = datetime.timezone(datetime.timedelta(hours=7))
-        now = datetime.datetime.now(tz)
-        
-        # Helper: แปลงเป็นสตริงไทยแบบย่อ (d/m/yy)
-        def to_short_thai_date(dt):
-            year_short = str(dt.year + 543)[-2:] 
-            return f"{dt.day}/{dt.month}/{year_short}"
+        now = datetime.datetime.now(THAI_TZ)
 
         # สร้างโพยปฏิทิน 7 วัน
-        thai_days = ["จันทร์", "อังคาร", "พุธ", "พฤหัส", "ศุกร์", "เสาร์", "อาทิตย์"]
+        thai_days = THAI_WEEKDAYS
         calendar_cheat_sheet = ""
         for i in range(1, 8): 
             future_date = now + datetime.timedelta(days=i)
@@ -703,12 +2213,7 @@ def create_followup_mission(customer, report_text, original_topic):
         tomorrow_str = to_short_thai_date(now + datetime.timedelta(days=1))
         
         # เดือนหน้า (Default)
-        try:
-            next_month_date = now.replace(month=now.month+1)
-        except ValueError:
-            if now.month == 12: next_month_date = now.replace(year=now.year+1, month=1)
-            else: next_month_date = now.replace(month=now.month+1, day=28)
-        next_month_str = to_short_thai_date(next_month_date)
+        next_month_str = to_short_thai_date(next_month_of(now))
         
         prompt = f"""
         Role: ระบบ Scheduler
@@ -747,30 +2252,41 @@ def create_followup_mission(customer, report_text, original_topic):
         Output JSON: {{ "create": true, "topic": "...", "desc": "...", "status": "pending" }}
         """
         
-        completion = client.chat.completions.create(
+        content = llm_complete(
             model="llama-3.3-70b-versatile", 
-            messages=[{"role": "user", "content": prompt}], 
+            prompt=prompt, 
             temperature=0.0, 
             response_format={"type": "json_object"}
         )
-        return json.loads(completion.choices[0].message.content)
+        return json.loads(content)
     except:
         return {"create": True, "topic": "Follow up (Auto)", "desc": report_text, "status": "pending"}
     
 
 # 3.3 AI Coach
+def build_talking_points_prompt(customer, mission_df):
+    tasks = "\n".join([f"- {row['topic']}: {row['desc']}" for _, row in mission_df.iterrows()])
+    return f"Role: Sales Coach\nCustomer: {customer}\nTask: {tasks}\nOutput: Ice Breaker (1), Talking Points (3). Thai language."
+
+TALKING_POINTS_LLM = {
+    "model": "llama-3.3-70b-versatile",
+    "temperature": 0.7,
+    "cache_nondeterministic": True  # โจทย์ชุดเดิม ไม่ต้องคิดบทพูดใหม่
+}
+
 def generate_talking_points(customer, mission_df):
-    try:
-        client = Groq(api_key=st.secrets["GROQ_API_KEY"])
-        tasks = "\n".join([f"- {row['topic']}: {row['desc']}" for _, row in mission_df.iterrows()])
-        completion = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[{"role": "user", "content": f"Role: Sales Coach\nCustomer: {customer}\nTask: {tasks}\nOutput: Ice Breaker (1), Talking Points (3). Thai language."}],
-            temperature=0.7
-        )
-        return completion.choices[0].message.content
+    try: return llm_complete(prompt=build_talking_points_prompt(customer, mission_df), **TALKING_POINTS_LLM)
     except: return "..."
 
+def stream_talking_points(customer, mission_df):
+    streamed = False
+    try:
+        for token in llm_stream(prompt=build_talking_points_prompt(customer, mission_df), **TALKING_POINTS_LLM):
+            streamed = True
+            yield token
+    except Exception:
+        if not streamed: yield "..."
+
 
 # ==========================================
 # 3.2 [FIXED] วิเคราะห์ Sentiment (ตัดคำเวิ่นเว้อทิ้ง)
@@ -778,17 +2294,8 @@ def generate_talking_points(customer, mission_df):
 # ==========================================
 # 3.2 [UPDATED] วิเคราะห์ Sentiment (จูนให้ Positive ง่ายขึ้น)
 # ==========================================
-def analyze_sentiment(report_text):
-    try:
-        client = Groq(api_key=st.secrets["GROQ_API_KEY"])
-        
-        prompt = f"""
-        Role: Sales Analyst ผู้มองโลกในแง่ธุรกิจ
-        Task: ให้คะแนน Sentiment จากรายงาน: "{report_text}"
-        
-        🔥 เกณฑ์การให้คะแนน (Strict Business Criteria):
-        
-        🟢 Positive (ดี/บวก):
+# เกณฑ์ที่ใช้ร่วมกันหลาย prompt
+SENTIMENT_CRITERIA = """🟢 Positive (ดี/บวก):
            - **มีออเดอร์** (ไม่ว่าจะสั่งเพิ่ม หรือ สั่งต่อเนื่อง)
            - **ลูกค้ายังใช้อยู่** (Active Customer)
            - สนใจ, นัดวันได้, ตอบรับดี
@@ -802,66 +2309,349 @@ def analyze_sentiment(report_text):
         🔴 Negative (ลบ/แย่):
            - ปฏิเสธชัดเจน, ไม่สนใจ, เลิกซื้อ, ระงับ, ยกเลิก, ชะลอ
            - บ่นด่า, มีปัญหาคุณภาพสินค้า
-           - หันไปใช้คู่แข่ง
+           - หันไปใช้คู่แข่ง"""
+
+APPOINTMENT_CRITERIA = """✅ PASS (มีวันนัด): 
+           - มีการระบุวันที่ชัดเจน (เช่น 7 ธ.ค., วันที่ 15)
+           - มีการระบุเวลาสัมพัทธ์ (เช่น พรุ่งนี้, สัปดาห์หน้า, เดือนหน้า, วันอังคารหน้า)
+           - มีการระบุช่วงเวลา (เช่น ต้นเดือนหน้า, ปลายสัปดาห์นี้)
+           
+        ❌ FAIL (ไม่มีวันนัด):
+           - ไม่มีคำระบุเวลาเลย
+           - ใช้คำกวมๆ ที่ไม่ใช่วันนัด (เช่น เดี๋ยวค่อยดู, รอดูก่อน, ยังไม่รับปาก, ช่วงนี้ยุ่ง)"""
+
+def normalize_sentiment(result):
+    # Python Cleaning
+    if "Positive" in result: return "🟢 Positive"
+    if "Negative" in result: return "🔴 Negative"
+    return "🟡 Neutral" # Default เป็นกลางไว้ก่อน
+
+def analyze_sentiment(report_text):
+    try:
+        prompt = f"""
+        Role: Sales Analyst ผู้มองโลกในแง่ธุรกิจ
+        Task: ให้คะแนน Sentiment จากรายงาน: "{report_text}"
+        
+        🔥 เกณฑ์การให้คะแนน (Strict Business Criteria):
+        
+        {SENTIMENT_CRITERIA}
         
         Output: เลือก 1 อันเท่านั้น (🟢 Positive / 🟡 Neutral / 🔴 Negative)
         """
         
-        completion = client.chat.completions.create(
+        result = llm_complete(
             model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
+            prompt=prompt,
             temperature=0.0, 
             max_tokens=10
-        )
-        result = completion.choices[0].message.content.strip()
-        
-        # Python Cleaning
-        if "Positive" in result: return "🟢 Positive"
-        if "Negative" in result: return "🔴 Negative"
-        return "🟡 Neutral" # Default เป็นกลางไว้ก่อน
+        ).strip()
+        return normalize_sentiment(result)
         
     except: return "⚪ Unknown"
 
 # ==========================================
 # [NEW] 3.5 AI Validator (ผู้คุมกฎ: ตรวจวันนัดหมาย)
 # ==========================================
+# คำบอกเวลาสัมพัทธ์ / วันในสัปดาห์ / ช่วงเวลา (ตามเกณฑ์ PASS ใน APPOINTMENT_CRITERIA)
+APPOINTMENT_TIME_PATTERN = re.compile(
+    r"พรุ่งนี้|มะรืน|(?:สัปดาห์|อาทิตย์|วีค|เดือน|ปี)หน้า|"
+    r"(?:ต้น|กลาง|ปลาย|สิ้น)(?:เดือน|สัปดาห์|อาทิตย์|ปี)|อีก\s*\d+\s*(?:วัน|สัปดาห์|อาทิตย์|เดือน)|"
+    r"วัน(?:จันทร์|อังคาร|พุธ|พฤหัส|ศุกร์|เสาร์|อาทิตย์)(?:บดี)?\s*(?:หน้า|นี้)"
+)
+# คำบอกเวลาที่ใช้เล่าผลงาน/เรื่องที่ผ่านมาได้ด้วย (เช่น "ยอดเดือนนี้ดีมาก", "ส่งของเมื่อวันที่ 15 แล้ว", "วันจันทร์สั่งของ") -> ให้ AI ตัดสิน
+APPOINTMENT_WEAK_TIME_PATTERN = re.compile(r"(?:สัปดาห์|อาทิตย์|วีค|เดือน|ปี)นี้|วันที่\s*\d{1,2}|วัน(?:จันทร์|อังคาร|พุธ|พฤหัส|ศุกร์|เสาร์|อาทิตย์)")
+# คำกวมๆ / ปฏิเสธการนัด -> มีคำบอกเวลาด้วยก็ยังต้องให้ AI ตัดสิน
+APPOINTMENT_VAGUE_PATTERN = re.compile(r"เดี๋ยวค่อย|ค่อยดู|รอดู|ยังไม่รับปาก|ยุ่ง|ยังไม่(?:ได้)?นัด|ไม่ได้นัด|ไม่สะดวก|ยังไม่แน่|ไม่แน่ใจ")
+# คำที่ส่อว่าอาจมีนัดแต่กฎจับไม่ได้ (เช่น "ครั้งหน้า", "เข้าไปหาอีกที") -> ให้ AI ตัดสิน
+APPOINTMENT_HINT_PATTERN = re.compile(r"นัด|หน้า|เจอกัน|อีกที|อีกครั้ง|กลับไป|เข้าไป|ช่วง|เวลา|โมง")
+
+def precheck_next_appointment(report_text):
+    # True = PASS, False = FAIL, None = ไม่ชัด ต้องถาม AI
+    text = strip_report_headings(report_text)
+    explicit = classify_mission_dates([text])["due_date"].iloc[0]
+    is_upcoming = pd.notna(explicit) and explicit.date() > thai_today()  # วันที่ที่ผ่านไปแล้ว = เล่าเรื่องเก่า ไม่ใช่วันนัด
+    # คำบอกเวลาที่มี "เมื่อ/ที่แล้ว/ที่ผ่านมา" อยู่ใกล้ๆ = เล่าย้อนหลัง -> ไม่นับเป็น PASS ให้ AI ตัดสิน
+    has_time = any(not is_past_reference(text, m) for m in APPOINTMENT_TIME_PATTERN.finditer(text))
+    if has_time or is_upcoming:
+        return None if APPOINTMENT_VAGUE_PATTERN.search(text) else True
+    if (pd.notna(explicit) or DATE_DIGIT_PATTERN.search(text) or APPOINTMENT_TIME_PATTERN.search(text) or
+            APPOINTMENT_WEAK_TIME_PATTERN.search(text) or APPOINTMENT_HINT_PATTERN.search(text)): return None
+    return False
+
+VALIDATE_DEBOUNCE_SEC = 2.0  # แก้ข้อความแล้วไม่ชัด -> ถาม AI เมื่อหยุดแก้ไปแล้วอย่างน้อยเท่านี้ (หรือกดปุ่มตรวจ)
+VALIDATE_POLL_SEC = 0.5
+
 def validate_next_appointment(report_text):
+    local = precheck_next_appointment(report_text)
+    if local is not None: return local
     try:
-        client = Groq(api_key=st.secrets["GROQ_API_KEY"])
         prompt = f"""
         Role: Appointment Auditor (ผู้ตรวจสอบวันนัด)
         Task: ตรวจสอบว่าในรายงานนี้ มีการระบุ "วันนัดหมายครั้งต่อไป" หรือไม่
         Report: "{report_text}"
         
         Criteria (เกณฑ์การผ่าน):
-        ✅ PASS (มีวันนัด): 
-           - มีการระบุวันที่ชัดเจน (เช่น 7 ธ.ค., วันที่ 15)
-           - มีการระบุเวลาสัมพัทธ์ (เช่น พรุ่งนี้, สัปดาห์หน้า, เดือนหน้า, วันอังคารหน้า)
-           - มีการระบุช่วงเวลา (เช่น ต้นเดือนหน้า, ปลายสัปดาห์นี้)
-           
-        ❌ FAIL (ไม่มีวันนัด):
-           - ไม่มีคำระบุเวลาเลย
-           - ใช้คำกวมๆ ที่ไม่ใช่วันนัด (เช่น เดี๋ยวค่อยดู, รอดูก่อน, ยังไม่รับปาก, ช่วงนี้ยุ่ง)
+        {APPOINTMENT_CRITERIA}
         
         Output: ตอบเพียงแค่ "PASS" หรือ "FAIL" เท่านั้น
         """
-        completion = client.chat.completions.create(
+        result = llm_complete(
             model="llama-3.1-8b-instant", # ใช้รุ่นเล็กก็พอ ประหยัดและเร็ว
-            messages=[{"role": "user", "content": prompt}],
+            prompt=prompt,
             temperature=0.0, 
             max_tokens=5
-        )
-        result = completion.choices[0].message.content.strip()
+        ).strip()
         return result == "PASS"
     except: return False # ถ้า AI error ให้ถือว่าไม่ผ่านไว้ก่อน (ปลอดภัยไว้ก่อน)
 
+@st.fragment(run_every=VALIDATE_POLL_SEC)
+def wait_for_validation():
+    # rerun เฉพาะ fragment นี้จนหยุดแก้ครบ VALIDATE_DEBOUNCE_SEC แล้วถาม AI เอง (หรือกดปุ่มเพื่อถามทันที)
+    idle = time.time() - st.session_state.get("report_edited_at", 0) >= VALIDATE_DEBOUNCE_SEC
+    if idle or st.button("🔍 ตรวจวันนัด", use_container_width=True):
+        with st.spinner("ตรวจสอบวันนัด..."):
+            st.session_state.is_report_valid = validate_next_appointment(st.session_state.report_text_buffer)
+        st.rerun()
+
+def appointment_verdict(report_text, llm_answer):
+    # ใช้กับผล JSON ของ analyze_voice_report / assess_report: กฎในเครื่องตัดสินได้ -> เชื่อกฎก่อน (เหมือน validate_next_appointment)
+    local = precheck_next_appointment(report_text)
+    return local if local is not None else str(llm_answer).lower() == "true"
+
+# ==========================================
+# [NEW] 3.6 AI Report Analyzer (สรุป + ตรวจวันนัด + Sentiment ใน call เดียว)
+# ==========================================
+def analyze_voice_report(raw_text, customer_name, mission_df):
+    # คืน {summary, has_next_appointment, appointment_date, sentiment} / None = ให้ไปใช้ฟังก์ชันเดิม (3.1 + 3.5)
+    try:
+        if "GROQ_API_KEY" not in st.secrets: return None
+        if not mission_df.empty:
+            tasks_text = "\n".join([f"- {row['topic']}" for _, row in mission_df.iterrows()])
+        else:
+            tasks_text = "ไม่มีโจทย์พิเศษ"
+
+        prompt = f"""
+        Role: AI วิเคราะห์รายงานการขาย
+        Input: "{raw_text}"
+        
+        Context: เซลล์ไปเยี่ยมลูกค้า "{customer_name}" โดยมีโจทย์ที่ต้องถามคือ:
+        {tasks_text}
+        
+        งานที่ 1 - summary: สรุปแบบ "เนื้อๆ เน้นๆ"
+        1. **จับคู่:** ถ้าสิ่งที่เซลล์พูด เกี่ยวข้องกับโจทย์ข้อไหน ให้สรุปใส่ข้อนั้น Format: "- **[ชื่อโจทย์]**: [เนื้อหาที่เซลล์พูด]"
+        2. **ตัดทิ้ง:** โจทย์ข้อไหนที่เซลล์ "ไม่ได้พูดถึง" ห้ามเขียนออกมา (ห้ามเขียนว่า ไม่มีข้อมูล / ไม่ได้ระบุ)
+        3. **ส่วนเกิน:** ถ้าไม่ตรงกับโจทย์ข้อไหนเลย ให้ใส่ในหัวข้อ "- **ข้อมูลเพิ่มเติม**: ..."
+        
+        งานที่ 2 - has_next_appointment: มีการระบุ "วันนัดหมายครั้งต่อไป" หรือไม่
+        {APPOINTMENT_CRITERIA}
+        appointment_date: วันนัดที่พูดถึง (d/m/yy หรือข้อความตามที่พูด) ถ้าไม่มีให้เป็น ""
+        
+        งานที่ 3 - sentiment:
+        {SENTIMENT_CRITERIA}
+        
+        Output JSON: {{ "summary": "...", "has_next_appointment": true, "appointment_date": "...", "sentiment": "Positive|Neutral|Negative" }}
+        """
+        content = llm_complete(
+            model="llama-3.3-70b-versatile",
+            prompt=prompt,
+            temperature=0.1,
+            max_tokens=600,
+            response_format={"type": "json_object"},
+            cache_nondeterministic=True
+        )
+        result = json.loads(content)
+        summary = str(result.get("summary") or "").strip()
+        if not summary: return None
+        return {
+            "summary": summary,
+            "has_next_appointment": appointment_verdict(summary, result.get("has_next_appointment")),
+            "appointment_date": str(result.get("appointment_date") or ""),
+            "sentiment": normalize_sentiment(str(result.get("sentiment") or "")),
+        }
+    except: return None
+
+def assess_report(report_text):
+    # ใช้หลัง stream สรุปจบ: ตรวจวันนัด + sentiment ใน call เดียว (แทน validate ตอนนี้ + analyze_sentiment ตอน Save)
+    # คืน {has_next_appointment, appointment_date, sentiment} / None = ให้ไปใช้ validate_next_appointment
+    try:
+        if "GROQ_API_KEY" not in st.secrets: return None
+        prompt = f"""
+        Role: AI วิเคราะห์รายงานการขาย
+        Report: "{report_text}"
+        
+        งานที่ 1 - has_next_appointment: มีการระบุ "วันนัดหมายครั้งต่อไป" หรือไม่
+        {APPOINTMENT_CRITERIA}
+        appointment_date: วันนัดที่พูดถึง (d/m/yy หรือข้อความตามที่พูด) ถ้าไม่มีให้เป็น ""
+        
+        งานที่ 2 - sentiment:
+        {SENTIMENT_CRITERIA}
+        
+        Output JSON: {{ "has_next_appointment": true, "appointment_date": "...", "sentiment": "Positive|Neutral|Negative" }}
+        """
+        content = llm_complete(
+            model="llama-3.1-8b-instant",
+            prompt=prompt,
+            temperature=0.0,
+            max_tokens=100,
+            response_format={"type": "json_object"}
+        )
+        result = json.loads(content)
+        return {
+            "has_next_appointment": appointment_verdict(report_text, result.get("has_next_appointment")),
+            "appointment_date": str(result.get("appointment_date") or ""),
+            "sentiment": normalize_sentiment(str(result.get("sentiment") or "")),
+        }
+    except: return None
+
+# ==========================================
+# 3.7 CLOSE VISIT PIPELINE (LLM 2 ตัวทำพร้อมกัน -> เขียนทีเดียว)
+# ==========================================
+LLM_WORKERS = 8
+
+@st.cache_resource
+def get_llm_executor():
+    return ThreadPoolExecutor(max_workers=LLM_WORKERS, thread_name_prefix="llm")
+
+def run_close_visit(cur_user, customer, report_text, topics, sentiment=None):
+    # Graph: sentiment ──┐   (ข้ามได้ถ้าได้มาแล้วจาก analyze_voice_report)
+    #        follow-up ──┴─> close_visit (Reports + ลบงานเก่า + งานใหม่ ใน batch เดียว)
+    with timed("pipeline.close_visit"):
+        executor = get_llm_executor()
+        sentiment_job = executor.submit(analyze_sentiment, report_text) if sentiment is None else None
+        followup_job = executor.submit(create_followup_mission, customer, report_text, topics)
+        if sentiment_job: sentiment = sentiment_job.result()
+        fup = followup_job.result()
+
+        ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # Format Reports: [Timestamp, User, Cust, Topics, Status, Sentiment, Summary]
+        report_row = [ts, cur_user, customer, topics, "Completed", sentiment, report_text]
+        followup_row = None
+        if fup.get("create"):
+            followup_row = [customer, fup['topic'], fup['desc'], "pending", cur_user, parse_due_date(f"{fup['topic']} {fup['desc']}")]
+        saved = close_visit(report_row, customer, followup_row)
+    return saved, (fup if followup_row else None)
+
+# ==========================================
+# 3.8 BATCH JOB: ให้คะแนน Sentiment ใหม่ (รันนอก Streamlit: python app.py rescore-sentiment)
+# ==========================================
+SENTIMENT_LABELS = ("🟢 Positive", "🔴 Negative", "🟡 Neutral")
+RESCORE_PAGE_SIZE = 200
+RESCORE_BATCH_SIZE = 20   # จำนวนรายงานต่อ 1 completion
+RESCORE_CHECKPOINT_PATH = os.path.join(LOCAL_DATA_DIR, "sentiment_rescore.json")
+
+def score_sentiments_batch(report_texts):
+    # หลายรายงานใน call เดียว -> list ผลตามลำดับ (None = AI ไม่ได้ตอบข้อนั้น / error)
+    try:
+        numbered = "\n".join(f"{i}. {json.dumps(str(text), ensure_ascii=False)}" for i, text in enumerate(report_texts, 1))
+        prompt = f"""
+        Role: Sales Analyst ผู้มองโลกในแง่ธุรกิจ
+        Task: ให้คะแนน Sentiment ของรายงานแต่ละฉบับต่อไปนี้
+        {numbered}
+        
+        🔥 เกณฑ์การให้คะแนน (Strict Business Criteria):
+        
+        {SENTIMENT_CRITERIA}
+        
+        Output JSON (ครบทุกข้อ): {{ "results": [ {{ "id": 1, "sentiment": "Positive|Neutral|Negative" }} ] }}
+        """
+        content = llm_complete(
+            model="llama-3.1-8b-instant",
+            prompt=prompt,
+            temperature=0.0,
+            max_tokens=30 * len(report_texts) + 50,
+            response_format={"type": "json_object"}
+        )
+        scores = {}
+        for item in json.loads(content).get("results", []):
+            try: scores[int(item["id"])] = normalize_sentiment(str(item.get("sentiment", "")))
+            except (KeyError, TypeError, ValueError): continue
+        return [scores.get(i) for i in range(1, len(report_texts) + 1)]
+    except Exception: return [None] * len(report_texts)
+
+def report_cell(cells, column):
+    # Sheets ตัดช่องว่างท้ายแถวทิ้ง -> แถวอาจสั้นกว่าจำนวนคอลัมน์
+    return cells[column] if column < len(cells) else ""
+
+def load_rescore_checkpoint(mode):
+    try:
+        with open(RESCORE_CHECKPOINT_PATH, encoding="utf-8") as f: checkpoint = json.load(f)
+        return checkpoint if checkpoint.get("mode") == mode else {}
+    except (OSError, ValueError): return {}
+
+def save_rescore_checkpoint(checkpoint):
+    os.makedirs(os.path.dirname(RESCORE_CHECKPOINT_PATH), exist_ok=True)
+    tmp_path = RESCORE_CHECKPOINT_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f: json.dump(checkpoint, f)
+    os.replace(tmp_path, RESCORE_CHECKPOINT_PATH)
+
+def rescore_sentiments(page_size=RESCORE_PAGE_SIZE, batch_size=RESCORE_BATCH_SIZE, rescore_all=False, restart=False, log=print):
+    # ไล่ Reports ทีละหน้า -> แถวที่ Unknown/ว่าง (หรือทุกแถวถ้า rescore_all) ส่งให้ AI ทีละ batch
+    # -> เขียน Sentiment กลับหน้าละ 1 request -> บันทึก checkpoint (สั่งรันซ้ำจะทำต่อจากหน้าล่าสุด)
+    repo = get_repository()
+    mode = "all" if rescore_all else "unknown"
+    checkpoint = {} if restart else load_rescore_checkpoint(mode)
+    start_row = checkpoint.get("next_row", repo.first_report_row)
+    sentiment_col = SHEET_COLUMNS["Reports"].index("Sentiment")
+    summary_col = SHEET_COLUMNS["Reports"].index("Summary")
+    totals = {"scanned": checkpoint.get("scanned", 0), "rescored": checkpoint.get("rescored", 0)}
+    if checkpoint: log(f"resume from row {start_row}")
+
+    for page in repo.iter_report_pages(start_row, page_size):
+        targets = [(row_id, cells) for row_id, cells in page
+                   if report_cell(cells, summary_col) and (rescore_all or report_cell(cells, sentiment_col) not in SENTIMENT_LABELS)]
+        batches = [targets[i:i + batch_size] for i in range(0, len(targets), batch_size)]
+        updates = {}
+        with timed("batch.rescore_page"):
+            results = get_llm_executor().map(lambda batch: score_sentiments_batch([report_cell(c, summary_col) for _, c in batch]), batches)
+            for batch, scores in zip(batches, results):
+                for (row_id, cells), score in zip(batch, scores):
+                    if score and score != report_cell(cells, sentiment_col): updates[row_id] = score
+            if updates: repo.update_report_sentiments(updates)
+        totals["scanned"] += len(page)
+        totals["rescored"] += len(updates)
+        save_rescore_checkpoint({"mode": mode, "next_row": page[-1][0] + 1, **totals})
+        log(f"rows {page[0][0]}-{page[-1][0]}: {len(targets)} to score, {len(updates)} updated")
+
+    try: os.remove(RESCORE_CHECKPOINT_PATH)  # จบครบ -> รอบหน้าเริ่มใหม่
+    except FileNotFoundError: pass
+    log(f"done: scanned {totals['scanned']} rows, updated {totals['rescored']}")
+    return totals
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="python app.py", description="RC Sales AI batch jobs (รันนอก Streamlit)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rescore = commands.add_parser("rescore-sentiment", help="ให้คะแนน Sentiment ใหม่ให้แถวที่เป็น Unknown")
+    rescore.add_argument("--all", action="store_true", help="ให้คะแนนใหม่ทุกแถว (เช่น หลังเปลี่ยนเกณฑ์)")
+    rescore.add_argument("--restart", action="store_true", help="ไม่สน checkpoint เริ่มจากแถวแรก")
+    rescore.add_argument("--page-size", type=int, default=RESCORE_PAGE_SIZE)
+    rescore.add_argument("--batch-size", type=int, default=RESCORE_BATCH_SIZE)
+    bench = commands.add_parser("benchmark-asr", help="วัด latency / WER / CER ของแต่ละ ASR backend กับชุดเสียงทดสอบ")
+    bench.add_argument("--samples", default=ASR_BENCHMARK_DIR)
+    bench.add_argument("--backends", nargs="+", default=list(ASR_BENCHMARK_BACKENDS))
+    args = parser.parse_args(argv)
+    if args.command == "rescore-sentiment":
+        rescore_sentiments(args.page_size, args.batch_size, rescore_all=args.all, restart=args.restart)
+    elif args.command == "benchmark-asr":
+        samples = load_asr_samples(args.samples)
+        if not samples:
+            print(f"ไม่พบไฟล์เสียงทดสอบใน {args.samples}")
+            return 1
+        print(benchmark_asr(samples, args.backends).to_string(index=False))
+    latency = get_latency_stats().summary()
+    if not latency.empty: print(latency.to_string(index=False))
+    return 0
+
+if __name__ == "__main__" and not st.runtime.exists():
+    sys.exit(main(sys.argv[1:]))
 
 # ==========================================
 # 4. UI & LOGIC
 # ==========================================
 try:
-    df_assignments = get_data("Assignments")
-    df_missions = get_data("Missions")
+    all_data = load_all_data()
+    df_assignments = all_data["Assignments"]
+    df_missions = all_data["Missions"]
+    data_index = get_data_index(df_assignments, df_missions)
 except: st.stop()
 
 if 'report_text_buffer' not in st.session_state: st.session_state.report_text_buffer = ""
@@ -869,11 +2659,42 @@ if 'raw_voice_buffer' not in st.session_state: st.session_state.raw_voice_buffer
 if 'talking_points_cache' not in st.session_state: st.session_state.talking_points_cache = None
 if 'is_report_valid' not in st.session_state: st.session_state.is_report_valid = False
 
+# แจ้งผลจากรอบก่อน (แทนการ sleep รอให้เห็น toast ก่อน rerun)
+if 'pending_toast' in st.session_state: st.toast(st.session_state.pop('pending_toast'), icon="📅")
+
 
 user_role = st.sidebar.radio("Login Role:", ("Sales Manager", "Sales Rep"))
 
+write_status = get_write_queue().status()
+if write_status["pending"]:
+    st.sidebar.caption(f"⏳ กำลังบันทึกลงชีต {write_status['pending']} รายการ")
+elif write_status["last_flush"]:
+    st.sidebar.caption(f"✅ บันทึกครบแล้ว ({write_status['last_flush'].strftime('%H:%M:%S')})")
+if write_status["last_error"]: st.sidebar.warning(f"Sync Error: {write_status['last_error']}")
+with st.sidebar.expander("⏱️ Latency"):
+    st.dataframe(get_latency_stats().summary(), hide_index=True)
+with st.sidebar.expander("🧠 LLM Cache"):
+    llm_stats = get_llm_cache().snapshot()
+    llm_lookups = llm_stats["memory_hits"] + llm_stats["disk_hits"] + llm_stats["misses"]
+    st.caption(f"Hit rate: {(llm_stats['memory_hits'] + llm_stats['disk_hits']) / llm_lookups:.0%}" if llm_lookups else "Hit rate: -")
+    st.dataframe(pd.DataFrame([llm_stats]), hide_index=True)
+    try: st.dataframe(pd.DataFrame([get_groq_gateway().snapshot()]), hide_index=True)
+    except Exception: st.caption("Groq: ยังไม่ได้ตั้งค่า GROQ_API_KEY")
+
+st.sidebar.caption(f"💾 Storage: {get_repository().name}")
+asr_backend = get_asr_backend()
+st.sidebar.caption(f"🎙️ ASR: {asr_backend.name}" + (f" ({asr_backend.note})" if asr_backend.note else ""))
+# ถอดเสียงทั้งชุดผ่าน network + โหลด whisper ในแอปจริง -> เปิดเฉพาะเมื่อตั้ง ASR_BENCHMARK_UI (ปกติใช้ python app.py benchmark-asr)
+asr_samples = load_asr_samples() if get_bool_setting("ASR_BENCHMARK_UI", False) else []
+if asr_samples:
+    with st.sidebar.expander("🎙️ ASR Benchmark"):
+        st.caption(f"{len(asr_samples)} ไฟล์ใน {ASR_BENCHMARK_DIR}")
+        if st.button("▶️ วัด Latency / WER"):
+            with st.spinner("กำลังถอดเสียงชุดทดสอบ..."): st.dataframe(benchmark_asr(asr_samples), hide_index=True)
+
 if st.sidebar.button("🔄 Refresh"):
     st.cache_data.clear()
+    get_repository().invalidate()
     st.session_state.report_text_buffer = ""
     st.session_state.raw_voice_buffer = ""
     st.session_state.talking_points_cache = None
@@ -887,41 +2708,48 @@ if user_role == "Sales Manager":
     with t1:
         c1, c2 = st.columns(2)
         with c1:
-            s_list = df_assignments['Sales_Rep'].unique() if not df_assignments.empty else []
-            sel_sale = st.selectbox("Sales Rep", s_list)
-            c_list = df_assignments[df_assignments['Sales_Rep'] == sel_sale]['Customer'].unique() if not df_assignments.empty and sel_sale else []
+            sel_sale = st.selectbox("Sales Rep", data_index.reps)
+            c_list = data_index.customers_of(sel_sale)
             sel_cust = st.selectbox("Customer", c_list)
         with c2:
             topic = st.text_input("หัวข้อ")
             desc = st.text_input("รายละเอียด")
             if st.button("➕ บันทึก", type="primary"):
                 if topic and sel_cust:
-                    if 'Sales_Rep' in df_missions.columns:
-                        append_data("Missions", [sel_cust, topic, desc, "pending", sel_sale])
-                    else:
-                        # Fallback for older sheet structure if needed, though better to update sheet.
-                        # Assuming new structure: Customer, Topic, Desc, Status, Sales_Rep
-                         append_data("Missions", [sel_cust, topic, desc, "pending", sel_sale])
+                    # Format Missions: [Customer, Topic, Desc, Status, Sales_Rep, due_date]
+                    append_data("Missions", [sel_cust, topic, desc, "pending", sel_sale, parse_due_date(f"{topic} {desc}")])
                     st.success("Saved!")
                     time.sleep(1)
                     st.rerun()
     with t2:
-        # Join Missions with Assignments to get Sales Rep if not present in Missions
-        if 'Sales_Rep' not in df_missions.columns and not df_assignments.empty and not df_missions.empty:
-             df_missions_with_rep = pd.merge(df_missions, df_assignments[['Customer', 'Sales_Rep']], on='Customer', how='left')
-             st.dataframe(df_missions_with_rep)
-        else:
-             st.dataframe(df_missions)
+        # Sales Rep ของ Missions ถูก join ไว้แล้วต่อ data version (DataIndex / SQLite backfill)
+        show_table_page("Missions", "missions_table", data_index, data_index.mission_statuses)
     with t3: 
-        try: st.dataframe(get_data("Reports"))
-        except: st.info("No Data")
+        stats = None
+        try: stats = get_report_aggregates().update(get_repository(), reports_generation())
+        except Exception as e: st.error(f"Load Error: {e}")
+        if stats is not None and stats.n_rows == 0: st.info("No Data")
+        elif stats is not None:
+            m1, m2, m3 = st.columns(3)
+            m1.metric("รายงานทั้งหมด", f"{stats.n_rows:,}")
+            m2.metric("เซลล์", len(stats.visits_frame().columns))
+            latency = stats.latency_frame()
+            if not latency.empty: m3.metric("ปิด follow-up เฉลี่ย (วัน)", round(latency["closed"].mul(latency["avg_days"]).sum() / latency["closed"].sum(), 1))
+
+            st.caption("การเข้าเยี่ยมต่อเซลล์")
+            freq = st.radio("ช่วง", ["รายวัน", "รายสัปดาห์"], horizontal=True, label_visibility="collapsed")
+            st.bar_chart(stats.visits_frame("D" if freq == "รายวัน" else "W"))
+            st.caption("Sentiment ต่อลูกค้า")
+            st.dataframe(stats.sentiment_frame())
+            st.caption("เวลาตั้งแต่สร้าง follow-up ถึงปิดงาน (วัน)")
+            st.dataframe(latency, hide_index=True)
+            with st.expander("ดูข้อมูลดิบ"): show_table_page("Reports", "reports_table", data_index, SENTIMENT_LABELS)
 
 # --- SALES REP ---
 else:
     st.header("📱 Sales App")
-    s_list = df_assignments['Sales_Rep'].unique() if not df_assignments.empty else []
-    cur_user = st.selectbox("👤 Login:", s_list)
-    my_custs = df_assignments[df_assignments['Sales_Rep'] == cur_user]['Customer'].unique() if not df_assignments.empty and cur_user else []
+    cur_user = st.selectbox("👤 Login:", data_index.reps)
+    my_custs = data_index.customers_of(cur_user)
     
     st.divider()
     target_cust = st.selectbox("🏢 เลือกลูกค้า:", my_custs)
@@ -932,33 +2760,29 @@ else:
         st.session_state.raw_voice_buffer = ""
         st.session_state.talking_points_cache = None
         st.session_state.is_report_valid = False
+        st.session_state.transcribe_job = None  # เสียงที่กำลังถอดเป็นของลูกค้าเดิม -> ทิ้ง
         st.session_state.last_cust = target_cust
 
-    my_missions = pd.DataFrame()
-    if not df_missions.empty and 'Customer' in df_missions.columns:
-        # Filter by customer AND sales rep if Sales_Rep column exists in Missions
-        if 'Sales_Rep' in df_missions.columns:
-            my_missions = df_missions[(df_missions['Customer'] == target_cust) & (df_missions['Sales_Rep'] == cur_user)]
-        else:
-            # Fallback: Filter only by customer, assuming assignments are unique per customer for simplicity in this context
-            my_missions = df_missions[df_missions['Customer'] == target_cust]
-
-    today_missions = []
-    future_missions = []
-    for _, row in my_missions.iterrows():
-        full_text = f"{row['topic']} {row['desc']}"
-        if get_task_status_by_date(full_text) == 'today': today_missions.append(row)
-        else: future_missions.append(row)
-    
-    df_today = pd.DataFrame(today_missions)
-    df_future = pd.DataFrame(future_missions)
+    my_missions = df_missions.iloc[data_index.mission_positions(cur_user, target_cust)]
+
+    df_today, df_future = pd.DataFrame(), pd.DataFrame()
+    if not my_missions.empty:
+        # due_date เป็น YYYY-MM-DD เทียบแบบ string ได้เลย ("-" = ไม่มีกำหนด -> งานวันนี้)
+        is_future = mission_due_dates(my_missions) > thai_today().isoformat()
+        df_today = my_missions[~is_future]
+        df_future = my_missions[is_future]
 
     with st.expander("✨ ให้ AI ช่วยคิดบทพูด (Talking Points)", expanded=False):
         if st.button("💡 วิเคราะห์โจทย์"):
-            with st.spinner("Thinking..."):
-                ai_advice = generate_talking_points(target_cust, df_today)
-                st.session_state.talking_points_cache = ai_advice
-        if st.session_state.talking_points_cache: st.info(st.session_state.talking_points_cache)
+            if LLM_STREAMING:
+                # แสดงทีละ token ระหว่างรอ / ได้ข้อความเต็มแล้วค่อยเก็บลง cache
+                st.session_state.talking_points_cache = st.write_stream(stream_talking_points(target_cust, df_today))
+            else:
+                with st.spinner("Thinking..."):
+                    ai_advice = generate_talking_points(target_cust, df_today)
+                    st.session_state.talking_points_cache = ai_advice
+                st.info(st.session_state.talking_points_cache)
+        elif st.session_state.talking_points_cache: st.info(st.session_state.talking_points_cache)
     
     st.divider()
 
@@ -976,53 +2800,77 @@ else:
         c1, c2 = st.columns([1, 4])
         with c1:
             st.write("")
-            audio = mic_recorder(start_prompt="🎙️ พูด", stop_prompt="⏹️ หยุด", key="mic", format="webm", use_container_width=True)
+            # just_once: ได้ bytes เฉพาะตอนอัดเสร็จ (rerun ถัดไปไม่ต้อง decode base64 / ไม่ค้างใน session)
+            audio = mic_recorder(start_prompt="🎙️ พูด", stop_prompt="⏹️ หยุด", just_once=True, key="mic", format="webm", use_container_width=True)
         with c2:
             if audio:
                 if 'last_audio' not in st.session_state: st.session_state.last_audio = None
-                if audio['bytes'] != st.session_state.last_audio:
-                    st.session_state.last_audio = audio['bytes']
-                    with st.spinner("กำลังจับคู่คำตอบ..."):
-                        raw_text = transcribe_audio(audio['bytes'])
-                        if raw_text:
-                            st.session_state.raw_voice_buffer = raw_text
-                            summary = summarize_voice_report(raw_text, target_cust, df_today)
-                            st.session_state.report_text_buffer = summary
+                digest = audio_digest(audio['bytes'])
+                if digest != st.session_state.last_audio:
+                    st.session_state.last_audio = digest  # เก็บแค่ digest ไม่เก็บเสียงทั้งก้อน
+                    st.session_state.transcribe_job = get_transcription_jobs().submit(audio['bytes'])
+
+            job_id = st.session_state.get("transcribe_job")
+            if job_id:
+                if not get_transcription_jobs().done(job_id):
+                    wait_for_transcription(job_id)
+                else:
+                    st.session_state.transcribe_job = None
+                    raw_text = get_transcription_jobs().pop(job_id)
+                    if raw_text:
+                        st.session_state.raw_voice_buffer = raw_text
+                        analysis = None
+                        cached_summary = get_transcription_jobs().cached_summary(job_id, target_cust)
+                        if cached_summary:
+                            summary = cached_summary
+                        elif LLM_STREAMING:
+                            # สรุปขึ้นจอทีละ token / stream จบแล้วตรวจวันนัด + sentiment ใน call เดียว
+                            summary = st.write_stream(stream_voice_report(raw_text, target_cust, df_today))
+                            with st.spinner("ตรวจสอบวันนัด..."): analysis = assess_report(summary)
+                        else:
+                            with st.spinner("กำลังจับคู่คำตอบ..."):
+                                analysis = analyze_voice_report(raw_text, target_cust, df_today)
+                            summary = analysis["summary"] if analysis else summarize_voice_report(raw_text, target_cust, df_today)
+                        if analysis:
+                            st.session_state.is_report_valid = analysis["has_next_appointment"]
+                            # จำ sentiment ไว้ใช้ตอนกด Save (ใช้ได้เฉพาะถ้าข้อความไม่ถูกแก้)
+                            st.session_state.report_sentiment = {"text": summary, "sentiment": analysis["sentiment"]}
+                        else:
                             st.session_state.is_report_valid = validate_next_appointment(summary)
-                            st.rerun()
+                        get_transcription_jobs().remember_summary(job_id, target_cust, summary)
+                        st.session_state.report_text_buffer = summary
+                        st.rerun()
             
             new_report = st.text_area("📝 สรุปจาก AI (แก้ไขได้):", value=st.session_state.report_text_buffer, height=200)
             
             if new_report != st.session_state.report_text_buffer:
                 st.session_state.report_text_buffer = new_report
-                st.session_state.is_report_valid = validate_next_appointment(new_report)
+                # ตัดสินด้วยกฎก่อน / ไม่ชัด (None) -> รอให้หยุดแก้ก่อนค่อยถาม AI (ดูด้านล่าง)
+                st.session_state.is_report_valid = precheck_next_appointment(new_report)
+                st.session_state.report_edited_at = time.time()
             
             if st.session_state.raw_voice_buffer:
                 with st.expander("ดูข้อความเสียงต้นฉบับ"): st.caption(st.session_state.raw_voice_buffer)
 
         st.write("")
         if st.session_state.report_text_buffer:
-            if st.session_state.is_report_valid:
+            if st.session_state.is_report_valid is None:
+                wait_for_validation()
+            elif st.session_state.is_report_valid:
                 if st.button("🚀 ปิดงาน (Save)", type="primary", use_container_width=True):
-                    ts = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     topics = ", ".join(df_today['topic'].tolist())
-                    sentiment = analyze_sentiment(st.session_state.report_text_buffer)
-                    append_data("Reports", [ts, cur_user, target_cust, topics, "Completed", sentiment, st.session_state.report_text_buffer])
-                    delete_mission_from_sheet(target_cust)
-                    with st.spinner("Creating Next Mission..."):
-                        fup = create_followup_mission(target_cust, st.session_state.report_text_buffer, topics)
-                        if fup.get("create"):
-                            if 'Sales_Rep' in df_missions.columns:
-                                append_data("Missions", [target_cust, fup['topic'], fup['desc'], "pending", cur_user])
-                            else:
-                                append_data("Missions", [target_cust, fup['topic'], fup['desc'], "pending", cur_user]) # Assuming Sales_Rep column is added
-                            st.toast(f"Next: {fup['topic']}", icon="📅")
-                    st.session_state.report_text_buffer = ""
-                    st.session_state.raw_voice_buffer = ""
-                    st.session_state.talking_points_cache = None
-                    st.session_state.is_report_valid = False
-                    time.sleep(2)
-                    st.rerun()
+                    report_text = st.session_state.report_text_buffer
+                    known = st.session_state.get("report_sentiment") or {}
+                    sentiment = known.get("sentiment") if known.get("text") == report_text else None
+                    with st.spinner("Saving & Creating Next Mission..."):
+                        saved, fup = run_close_visit(cur_user, target_cust, report_text, topics, sentiment)
+                    if saved:
+                        if fup: st.session_state.pending_toast = f"Next: {fup['topic']}"
+                        st.session_state.report_text_buffer = ""
+                        st.session_state.raw_voice_buffer = ""
+                        st.session_state.talking_points_cache = None
+                        st.session_state.is_report_valid = False
+                        st.rerun()
             else:
                 st.error("⚠️ กรุณาระบุ 'วันนัดหมายครั้งถัดไป' ในรายงานให้ชัดเจน (เช่น พรุ่งนี้, สัปดาห์หน้า, 7 ธ.ค.)")
                 st.button("🔒 ปิดงาน (ต้องระบุวันนัดก่อน)", disabled=True, use_container_width=True)
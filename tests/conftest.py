@@ -0,0 +1,96 @@
+import pathlib
+import types
+
+import gspread
+import pytest
+
+APP_PATH = pathlib.Path(__file__).resolve().parents[1] / "app.py"
+
+
+@pytest.fixture(scope="session")
+def app():
+    # app.py เป็นสคริปต์ Streamlit ไฟล์เดียว -> โหลดเฉพาะส่วน logic (ก่อน "4. UI & LOGIC") มาทดสอบแบบ offline
+    src = APP_PATH.read_text(encoding="utf-8")
+    start = src.index("\nimport streamlit as st")  # ข้ามโค้ดเวอร์ชันเก่าที่ comment ไว้ด้านบน
+    end = src.rindex("# ====", 0, src.index("# 4. UI & LOGIC", start))
+    module = types.ModuleType("app")
+    module.__file__ = str(APP_PATH)
+    code = "\n" * src.count("\n", 0, start) + src[start:end]  # คงเลขบรรทัดให้ตรงกับ app.py
+    exec(compile(code, str(APP_PATH), "exec"), module.__dict__)
+    return module
+
+
+@pytest.fixture(autouse=True)
+def local_data_dir(tmp_path, monkeypatch):
+    # ไฟล์ .rc_local ของแต่ละ test แยกกัน
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+class FakeWorksheet:
+    # worksheet ในหน่วยความจำ: รองรับเฉพาะ call ที่ app.py ใช้
+    def __init__(self, rows, sheet_id=0):
+        self.rows = [list(r) for r in rows]
+        self.id = sheet_id
+        self.spreadsheet = self
+        self.calls = []
+        self.fail = None  # ตั้งเป็น Exception -> ทุก call ที่เขียนชีต raise อันนี้
+
+    def append_rows(self, rows):
+        self.calls.append("append_rows")
+        if self.fail: raise self.fail
+        self.rows.extend([str(v) for v in row] for row in rows)
+
+    def get_all_values(self):
+        self.calls.append("get_all_values")
+        return [list(r) for r in self.rows]
+
+    def col_values(self, col):
+        self.calls.append("col_values")
+        return [row[col - 1] if len(row) >= col else "" for row in self.rows]
+
+    def batch_update(self, body):
+        self.calls.append("batch_update")
+        if self.fail: raise self.fail
+        if isinstance(body, list):  # Worksheet.batch_update: [{"range": "F2:F3", "values": [[...], ...]}]
+            for update in body:
+                row, col = gspread.utils.a1_to_rowcol(update["range"].split(":")[0])
+                for offset, values in enumerate(update["values"]):
+                    target = self.rows[row - 1 + offset]
+                    target.extend([""] * (col - 1 + len(values) - len(target)))
+                    target[col - 1:col - 1 + len(values)] = values
+            return
+        for request in body["requests"]:
+            r = request["deleteDimension"]["range"]
+            del self.rows[r["startIndex"]:r["endIndex"]]
+
+
+@pytest.fixture
+def fake_sheet(app, monkeypatch, write_queue):
+    sheets = {}
+    monkeypatch.setattr(app, "with_worksheet", lambda name, op_name, fn: fn(sheets[name]))
+    return sheets
+
+
+class FakeResponse:
+    def __init__(self, code, message):
+        self.error = {"code": code, "message": message, "status": ""}
+        self.text = message
+
+    def json(self):
+        return {"error": self.error}
+
+
+@pytest.fixture
+def api_error(app):
+    return lambda code, message="": app.gspread.exceptions.APIError(FakeResponse(code, message))
+
+
+@pytest.fixture
+def write_queue(app, tmp_path, monkeypatch):
+    # ปิด background writer ระหว่าง test: flush เฉพาะตอนที่ test เรียกเอง
+    monkeypatch.setattr(app, "FLUSH_RETRY_SEC", 3600)
+    monkeypatch.setattr(app, "FLUSH_DELAY_SEC", 3600)
+    queue = app.WriteBehindQueue(str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(app, "get_write_queue", lambda: queue)
+    return queue
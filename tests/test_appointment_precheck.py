@@ -0,0 +1,40 @@
+import datetime
+
+import pytest
+
+TODAY = datetime.date(2026, 10, 17)
+
+
+@pytest.fixture(autouse=True)
+def fixed_today(app, monkeypatch):
+    monkeypatch.setattr(app, "thai_today", lambda: TODAY)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ลูกค้าสนใจ นัดเจอกันพรุ่งนี้", True),
+    ("เสนอราคาแล้ว เข้าพบอีกครั้ง 5/11/69", True),
+    ("ปิดการขายได้ สัปดาห์หน้าส่งของ", True),
+    ("ลูกค้าสั่งเพิ่ม", False),
+    ("ลูกค้าบอกเดี๋ยวค่อยดู สัปดาห์หน้าค่อยว่ากัน", None),
+    # หัวข้อโจทย์ที่มีวันที่ของงานเดิม ไม่ใช่วันนัดใหม่
+    ("- **Follow up 17/10/69 ร้านเอ: เสนอสินค้า**: ลูกค้าสนใจ สั่งเพิ่ม", False),
+    # เล่าผลงาน/เรื่องที่ผ่านมา -> ให้ AI ตัดสิน
+    ("ยอดเดือนนี้ดีมาก", None),
+    ("ปีนี้ยอดตก", None),
+    ("ส่งของเมื่อวันที่ 15 แล้ว", None),
+    ("ส่งของไปแล้ว 10/10/69", None),
+    # วันในสัปดาห์: นับเฉพาะ วัน...หน้า/นี้ ที่ไม่ได้เล่าย้อนหลัง
+    ("นัดเจอวันพฤหัสบดีหน้า", True),
+    ("นัดเจอวันอังคาร", None),
+    ("เมื่อวันจันทร์ลูกค้าสั่งของไปแล้ว", None),
+    ("วันอาทิตย์ที่แล้วส่งของไป ลูกค้าพอใจ", None),
+    ("วันจันทร์นี้ที่ผ่านมาส่งของแล้ว", None),
+])
+def test_precheck(app, text, expected):
+    assert app.precheck_next_appointment(text) is expected
+
+
+def test_validate_skips_llm_when_local_rule_decides(app, monkeypatch):
+    monkeypatch.setattr(app, "llm_complete", lambda **kwargs: pytest.fail("LLM should not be called"))
+    assert app.validate_next_appointment("นัดเจอวันอังคารหน้า") is True
+    assert app.validate_next_appointment("ลูกค้าสั่งเพิ่ม") is False
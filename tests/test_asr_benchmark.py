@@ -0,0 +1,49 @@
+import pathlib
+import shutil
+
+import pytest
+
+SAMPLE_DIR = pathlib.Path(__file__).resolve().parents[1] / "asr_samples"
+
+
+def test_committed_sample_set_is_complete(app):
+    samples = app.load_asr_samples(str(SAMPLE_DIR))
+    assert len(samples) == 8
+    assert all(reference for _, reference in samples)
+
+
+def test_benchmark_reuses_cached_backend(app, monkeypatch):
+    created = []
+    monkeypatch.setattr(app, "create_asr_backend", lambda name: created.append(name) or app.StubASRBackend(""))
+    app.load_asr_backend.clear()
+    try:
+        assert app.load_asr_backend("stub") is app.load_asr_backend("stub")
+        assert created == ["stub"]
+    finally: app.load_asr_backend.clear()
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_benchmark_scores_stub_backend(app, monkeypatch):
+    samples = app.load_asr_samples(str(SAMPLE_DIR))
+    perfect = app.StubASRBackend(samples[0][1])
+    monkeypatch.setattr(app, "load_asr_backend", lambda name: perfect)
+    row = app.benchmark_asr(samples[:1], ["stub"]).iloc[0]
+    assert (row["samples"], row["wer"], row["cer"]) == (1, 0.0, 0.0)
+    assert row["avg_ms"] > 0
+
+
+def test_benchmark_reports_failed_samples(app, monkeypatch):
+    monkeypatch.setattr(app, "transcribe_audio", lambda audio_bytes, backend: None)
+    monkeypatch.setattr(app, "load_asr_backend", lambda name: app.StubASRBackend(""))
+    row = app.benchmark_asr(app.load_asr_samples(str(SAMPLE_DIR))[:2], ["stub"]).iloc[0]
+    assert row["wer"] == 1.0 and row["note"].endswith("ถอดไม่สำเร็จ 2/2")
+
+
+def test_default_sample_dir_is_next_to_app(app):
+    assert app.ASR_BENCHMARK_DIR == str(SAMPLE_DIR)
+    assert len(app.load_asr_samples()) == 8  # cwd ของ test = tmp_path
+
+
+def test_asr_backend_without_recognize_fails_at_construction(app):
+    class Silent(app.ASRBackend): name = "silent"
+    with pytest.raises(TypeError, match="recognize"): Silent()
@@ -0,0 +1,35 @@
+import shutil
+import subprocess
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+
+
+def encode_tone(seconds, fmt="webm"):
+    # เสียงทดสอบแบบเดียวกับที่ mic_recorder ส่งมา (48 kHz stereo -> opus/webm)
+    cmd = ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", f"sine=frequency=300:sample_rate=48000:duration={seconds}",
+           "-ac", "2", "-c:a", "libopus", "-f", fmt, "pipe:1"]
+    return subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout
+
+
+def test_decodes_to_16k_mono_pcm(app):
+    audio = app.decode_audio_pcm(encode_tone(3))
+    assert (audio.sample_rate, audio.sample_width) == (app.ASR_SAMPLE_RATE, app.ASR_SAMPLE_WIDTH)
+    assert abs(len(audio.frame_data) - 3 * app.ASR_SAMPLE_RATE * app.ASR_SAMPLE_WIDTH) < app.ASR_SAMPLE_RATE  # ±0.25s
+
+
+def test_invalid_audio_raises(app):
+    with pytest.raises(RuntimeError):
+        app.decode_audio_pcm(b"not audio")
+
+
+def test_hung_ffmpeg_is_killed(app, monkeypatch):
+    audio_bytes = encode_tone(30)
+    monkeypatch.setattr(app, "ASR_DECODE_TIMEOUT_SEC", 0.5)
+    monkeypatch.setattr(app.AudioSegment, "converter", "ffmpeg")
+    # -re อ่าน input ตามเวลาจริง -> เสียง 30 วินาทีต้องโดน timeout
+    real_run = subprocess.run
+    monkeypatch.setattr(app.subprocess, "run", lambda cmd, **kw: real_run(cmd[:1] + ["-re"] + cmd[1:], **kw))
+    with pytest.raises(subprocess.TimeoutExpired):
+        app.decode_audio_pcm(audio_bytes)
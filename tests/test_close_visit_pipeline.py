@@ -0,0 +1,61 @@
+import json
+import time
+
+import pytest
+
+LLM_DELAY_SEC = 0.5
+
+
+@pytest.fixture
+def slow_llm(app, monkeypatch):
+    calls = []
+    def llm_complete(**kwargs):
+        calls.append(kwargs["model"])
+        time.sleep(LLM_DELAY_SEC)
+        if kwargs.get("response_format"):
+            return json.dumps({"create": True, "topic": "Follow up 1/11/69 ร้านเอ: เสนอสินค้า", "desc": "d", "status": "pending"})
+        return "🟢 Positive"
+    monkeypatch.setattr(app, "llm_complete", llm_complete)
+    return calls
+
+
+@pytest.fixture
+def saved(app, monkeypatch):
+    writes = []
+    monkeypatch.setattr(app, "close_visit", lambda *args: writes.append(args) or True)
+    return writes
+
+
+def test_llm_calls_run_concurrently(app, slow_llm, saved):
+    # วันนัดที่กฎในเครื่องไม่รู้จัก -> follow-up ต้องถาม LLM ด้วย (2 call พร้อมกัน)
+    started = time.perf_counter()
+    ok, fup = app.run_close_visit("r1", "ร้านเอ", "ลูกค้าสนใจ ต้นเดือนหน้าค่อยเข้าไป", "เสนอสินค้า")
+    elapsed = time.perf_counter() - started
+    assert ok and len(slow_llm) == 2
+    assert elapsed < LLM_DELAY_SEC * 1.8  # ทำทีละตัว = 1.0s (+ sleep 2s ของเดิม)
+    report_row, customer, followup_row = saved[0]
+    assert report_row[1:6] == ["r1", "ร้านเอ", "เสนอสินค้า", "Completed", "🟢 Positive"]
+    assert followup_row[:5] == ["ร้านเอ", fup["topic"], "d", "pending", "r1"]
+
+
+def test_known_sentiment_skips_sentiment_call(app, slow_llm, saved):
+    app.run_close_visit("r1", "ร้านเอ", "ลูกค้าสนใจ นัดพรุ่งนี้", "เสนอสินค้า", sentiment="🟡 Neutral")
+    assert slow_llm == []  # follow-up ตัดสินด้วยกฎ + sentiment ได้มาแล้ว
+    assert saved[0][0][5] == "🟡 Neutral"
+
+
+@pytest.mark.parametrize("delete_fails", [False, True])
+def test_sheets_close_visit_deletes_before_queueing(app, monkeypatch, delete_fails):
+    calls = []
+    def delete_missions(self, customer_name):
+        calls.append(("delete", customer_name))
+        if delete_fails: raise RuntimeError("429")
+    monkeypatch.setattr(app.SheetsRepository, "delete_missions", delete_missions)
+    monkeypatch.setattr(app.SheetsRepository, "append", lambda self, name, row: calls.append(("append", name)))
+    repo = app.SheetsRepository()
+    if delete_fails:
+        with pytest.raises(RuntimeError): repo.close_visit(["ts", "r1", "A"], "A", ["A", "Follow up"])
+        assert calls == [("delete", "A")]  # ไม่มี Reports เข้าคิว -> กดบันทึกซ้ำแล้วรายงานไม่ซ้ำ
+    else:
+        repo.close_visit(["ts", "r1", "A"], "A", ["A", "Follow up"])
+        assert calls == [("delete", "A"), ("append", "Reports"), ("append", "Missions")]
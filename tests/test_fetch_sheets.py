@@ -0,0 +1,56 @@
+import pytest
+
+REPORT_HEADER = ["Timestamp", "Sales_Rep", "Customer", "Topics", "Status", "Sentiment", "Summary"]
+
+
+@pytest.fixture
+def reports_sync(app, tmp_path, monkeypatch):
+    sync = app.ReportsSync(str(tmp_path / "reports_cache.pkl"))
+    sync._reset([REPORT_HEADER, ["2026-10-01 10:00:00", "r1", "A", "t", "Completed", "🟡 Neutral", "s"]])
+    sync._save()
+    monkeypatch.setattr(app, "get_reports_sync", lambda: sync)
+    return sync
+
+
+@pytest.fixture
+def fallback(app, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app, "get_data", lambda name: calls.append(name) or app.pd.DataFrame())
+    return calls
+
+
+def failing_batch_get(app, monkeypatch, error):
+    def raise_error(op_name, fn): raise error
+    monkeypatch.setattr(app, "with_spreadsheet", raise_error)
+
+
+def test_quota_error_keeps_reports_state_and_does_not_fan_out(app, monkeypatch, reports_sync, fallback, api_error):
+    failing_batch_get(app, monkeypatch, api_error(429, "Quota exceeded"))
+    with pytest.raises(app.gspread.exceptions.APIError): app.fetch_sheets(("Assignments", "Missions"))
+    with pytest.raises(app.gspread.exceptions.APIError): app.fetch_sheets(("Reports",))
+    assert fallback == []
+    assert reports_sync.header == REPORT_HEADER and reports_sync.n_rows == 1
+
+
+def test_delta_range_error_resyncs_reports(app, monkeypatch, reports_sync, fallback, api_error):
+    failing_batch_get(app, monkeypatch, api_error(400, "Range ('Reports'!A2:G) exceeds grid limits. Max rows: 1"))
+    app.fetch_sheets(("Missions", "Reports"))
+    assert fallback == ["Missions", "Reports"]
+    assert reports_sync.header == []
+
+
+def test_other_sheet_error_leaves_reports_state(app, monkeypatch, reports_sync, fallback, api_error):
+    failing_batch_get(app, monkeypatch, api_error(400, "Unable to parse range: 'Missions'"))
+    app.fetch_sheets(("Missions", "Reports"))
+    assert fallback == ["Missions", "Reports"]
+    assert reports_sync.header == REPORT_HEADER
+
+
+def test_sheet_cache_serves_previous_frame_on_quota_error(app, monkeypatch, write_queue, api_error):
+    cache = app.SheetCache(ttl=0)
+    monkeypatch.setattr(app, "fetch_sheets", lambda names: {"Missions": app.pd.DataFrame({"Customer": ["A"]})})
+    assert cache.get(("Missions",))["Missions"]["Customer"].tolist() == ["A"]
+    def quota(names): raise api_error(429)
+    monkeypatch.setattr(app, "fetch_sheets", quota)
+    assert cache.get(("Missions",))["Missions"]["Customer"].tolist() == ["A"]
+    with pytest.raises(app.gspread.exceptions.APIError): cache.get(("Assignments",))
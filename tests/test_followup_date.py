@@ -0,0 +1,34 @@
+import datetime
+
+import pytest
+
+TODAY = datetime.date(2026, 10, 17)  # วันเสาร์
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ลูกค้าสนใจ นัด 5/11/69", datetime.date(2026, 11, 5)),
+    ("เจอกันพรุ่งนี้", datetime.date(2026, 10, 18)),
+    ("นัดวันอังคารหน้า", datetime.date(2026, 10, 20)),
+    ("นัดวันพฤหัสบดีนี้", datetime.date(2026, 10, 22)),
+    ("เจอกันเดือนหน้า", datetime.date(2026, 11, 17)),
+    ("ลูกค้าสั่งเพิ่ม", datetime.date(2026, 11, 17)),
+    ("ต้นเดือนหน้าค่อยเข้าไป", None),
+    # วันที่ของงานเดิมในหัวข้อ / วันที่ผ่านไปแล้ว ไม่ใช่วันนัดใหม่
+    ("- **Follow up 17/10/69 ร้านเอ: เสนอสินค้า**: ลูกค้าสนใจ สั่งเพิ่ม", datetime.date(2026, 11, 17)),
+    ("- **นัด 1/10/69**: ส่งของแล้ว นัดอีกที 3/11/69", datetime.date(2026, 11, 3)),
+    ("ส่งของไปแล้ว 10/10/69", datetime.date(2026, 11, 17)),
+    # วันเฉยๆ / เล่าย้อนหลัง ไม่ใช่กฎ วัน...หน้า -> ให้ AI ตัดสิน
+    ("นัดวันอังคาร", None),
+    ("เมื่อวันจันทร์ลูกค้าสั่งของไปแล้ว", None),
+    ("วันอาทิตย์ที่แล้วส่งของไป ลูกค้าพอใจ", None),
+    ("วันจันทร์นี้ที่ผ่านมาส่งของแล้ว", None),
+])
+def test_resolve_followup_date(app, text, expected):
+    assert app.resolve_followup_date(text, today=TODAY) == expected
+
+
+def test_followup_mission_is_not_scheduled_for_today(app, monkeypatch):
+    monkeypatch.setattr(app, "thai_today", lambda: TODAY)
+    monkeypatch.setattr(app, "llm_complete", lambda **kwargs: pytest.fail("LLM should not be called"))
+    fup = app.create_followup_mission("ร้านเอ", "- **Follow up 17/10/69 ร้านเอ: เสนอสินค้า**: ลูกค้าสนใจ สั่งเพิ่ม", "เสนอสินค้า")
+    assert fup["topic"].startswith("Follow up 17/11/69 ร้านเอ")
@@ -0,0 +1,20 @@
+import pytest
+
+
+@pytest.mark.parametrize("value, expected", [("60", 60.0), (45, 45.0), ("1.5e3", 1500.0), ("abc", 30), ("0", 30), (None, 30)])
+def test_number_setting_parses_strings(app, monkeypatch, value, expected):
+    monkeypatch.setattr(app, "get_setting", lambda key, default=None: value)
+    assert app.get_number_setting("GROQ_RPM", 30) == expected
+
+
+def test_gateway_buckets_accept_string_limits(app, monkeypatch):
+    monkeypatch.setattr(app, "get_setting", lambda key, default=None: {"GROQ_RPM": "60", "GROQ_TPM": "6000"}.get(key, default))
+    requests_bucket, tokens_bucket = app.GroqGateway("test")._buckets("llama-3.1-8b-instant")
+    assert (requests_bucket.capacity, tokens_bucket.capacity) == (60.0, 6000.0)
+    assert requests_bucket.reserve(1) == 0.0
+
+
+def test_token_bucket_queues_when_empty(app):
+    bucket = app.TokenBucket(60)  # 1 ต่อวินาที
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
@@ -0,0 +1,68 @@
+import datetime
+import random
+import re
+import time
+
+TODAY = datetime.date(2026, 10, 17)
+THAI_MONTHS = ["ม.ค.", "มกราคม", "ก.พ.", "มี.ค.", "เม.ย.", "พฤษภาคม", "มิ.ย.", "ก.ค.", "ส.ค.", "ก.ย.", "ต.ค.", "ตุลาคม", "พ.ย.", "ธ.ค.", "ธันวาคม"]
+
+
+def legacy_task_status(topic_str, today=TODAY):
+    # get_task_status_by_date เวอร์ชันก่อน classify_mission_dates (ทีละแถว) ใช้เป็นค่าอ้างอิง
+    if not isinstance(topic_str, str): return 'today'
+    match_digit = re.search(r"(\d{1,2})\s*[\/\-]\s*(\d{1,2})\s*[\/\-]\s*(\d{2,4})", topic_str)
+    if match_digit:
+        d, m, y = map(int, match_digit.groups())
+        if y > 2400: y -= 543
+        elif y < 100: y += 1957 if y > 40 else 2000
+        try: return 'future' if datetime.date(y, m, d) > today else 'today'
+        except ValueError: return 'today'
+    match_thai = re.search(r"(\d{1,2})\s+([ก-๙.]+)", topic_str)
+    if match_thai:
+        day, month_str = int(match_thai.group(1)), match_thai.group(2)
+        thai_months = {"ม.ค.":1,"มกราคม":1,"ก.พ.":2,"กุมภาพันธ์":2,"มี.ค.":3,"มีนาคม":3,"เม.ย.":4,"เมษายน":4,"พ.ค.":5,"พฤษภาคม":5,"มิ.ย.":6,"มิถุนายน":6,"ก.ค.":7,"กรกฎาคม":7,"ส.ค.":8,"สิงหาคม":8,"ก.ย.":9,"กันยายน":9,"ต.ค.":10,"ตุลาคม":10,"พ.ย.":11,"พฤศจิกายน":11,"ธ.ค.":12,"ธันวาคม":12}
+        month = next((v for k, v in thai_months.items() if k in month_str), 0)
+        if month > 0:
+            year = today.year + (month < today.month)
+            try: return 'future' if datetime.date(year, month, day) > today else 'today'
+            except ValueError: return 'today'
+    return 'today'
+
+
+def generate_topics(n, seed=7):
+    rng = random.Random(seed)
+    topics = []
+    for _ in range(n):
+        kind = rng.randrange(5)
+        d, m = rng.randint(1, 31), rng.randint(1, 13)
+        if kind == 0: topics.append(f"Follow up {d}/{m}/{rng.choice([68, 69, 70, 25, 26])} ร้าน{rng.randrange(100)}")
+        elif kind == 1: topics.append(f"นัด {d}-{m}-{rng.choice([2568, 2569, 2026])}")
+        elif kind == 2: topics.append(f"เข้าพบ {d} {rng.choice(THAI_MONTHS)} เสนอราคา")
+        elif kind == 3: topics.append(f"ส่งของ {d} ชิ้น")
+        else: topics.append("ถามราคาสินค้า")
+    return topics
+
+
+def test_matches_legacy_row_by_row_function(app):
+    topics = generate_topics(20000)
+    is_future = app.classify_mission_dates(topics, today=TODAY)["is_future"]
+    assert is_future.tolist() == [legacy_task_status(t) == 'future' for t in topics]
+
+
+def test_faster_than_iterrows_split(app):
+    # หน้า Sales Rep เดิม: iterrows() แล้วเรียกฟังก์ชันทีละแถว
+    df = app.pd.DataFrame({"topic": generate_topics(20000)})
+    started = time.perf_counter()
+    legacy = [legacy_task_status(row["topic"]) for _, row in df.iterrows()]
+    legacy_sec = time.perf_counter() - started
+    started = time.perf_counter()
+    is_future = app.classify_mission_dates(df["topic"], today=TODAY)["is_future"]
+    vectorized_sec = time.perf_counter() - started
+    assert is_future.sum() == legacy.count('future')
+    assert vectorized_sec < legacy_sec
+
+
+def test_parse_due_date_formats(app):
+    assert app.parse_due_date("Follow up 5/11/69 ร้านเอ") == "2026-11-05"
+    assert app.parse_due_date("นัด 31/2/69") == app.NO_DUE_DATE
+    assert app.parse_due_date("ถามราคา") == app.NO_DUE_DATE
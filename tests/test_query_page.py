@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+REPS, CUSTOMERS = ["r1", "r2", "r3"], [f"C{i}" for i in range(12)]
+STATUSES = ["🟢 Positive", "🟡 Neutral", "🔴 Negative"]
+
+
+@pytest.fixture(scope="module")
+def repo(app, tmp_path_factory):
+    # 5,000 Missions / 3,000 Reports: ตัวกรองแต่ละแบบมีทั้งแถวที่ผ่านและไม่ผ่าน
+    repo = app.SQLiteRepository(str(tmp_path_factory.mktemp("db") / "rc_sales.db"))
+    with repo._conn() as conn:
+        repo._insert(conn, "Assignments", [[REPS[i % 3], c] for i, c in enumerate(CUSTOMERS)])
+        repo._insert(conn, "Missions", [[CUSTOMERS[i % 12], f"งาน {i}", "d", ["pending", "done"][i % 2], REPS[i % 12 % 3],
+                                         "-" if i % 10 == 0 else f"2026-{10 + i % 3}-{1 + i % 28:02d}"] for i in range(5000)])
+        repo._insert(conn, "Reports", [[f"2026-10-{1 + i % 28:02d} {i % 24:02d}:00:00", REPS[i % 3], CUSTOMERS[i % 12], "t", "Completed",
+                                        STATUSES[i % 3], "สรุป"] for i in range(3000)])
+    repo._touch("Assignments", "Missions", "Reports")
+    return repo
+
+
+FILTERS = [
+    {},
+    {"rep": "r2"},
+    {"customer": "C5", "status": "done"},
+    {"status": "🔴 Negative"},
+    {"date_from": datetime.date(2026, 10, 5), "date_to": datetime.date(2026, 10, 9)},
+    {"rep": "r1", "date_from": datetime.date(2026, 11, 1)},
+    {"date_to": datetime.date(2026, 10, 3)},
+    {"customer": "ไม่มี"},
+]
+
+
+@pytest.mark.parametrize("worksheet_name", ["Missions", "Reports"])
+@pytest.mark.parametrize("filters", FILTERS)
+@pytest.mark.parametrize("offset", [0, 150, 2990])
+def test_sqlite_page_matches_pandas(app, repo, worksheet_name, filters, offset):
+    columns = app.SHEET_COLUMNS[worksheet_name]
+    page, total = repo.query_page(worksheet_name, filters, offset, app.TABLE_PAGE_SIZE)
+    expected, expected_total = app.SalesRepository.query_page(repo, worksheet_name, filters, offset, app.TABLE_PAGE_SIZE)
+    assert total == expected_total
+    assert page[columns].values.tolist() == expected[columns].values.tolist()
@@ -0,0 +1,77 @@
+import time
+
+
+def report(day, rep="r1", customer="A", sentiment="🟡 Neutral"):
+    return [f"2026-10-{day:02d} 10:00:00", rep, customer, "t", "Completed", sentiment, "สรุป"]
+
+
+def sample_reports(n):
+    return [report(1 + i % 28, f"r{i % 3}", f"C{i % 7}", ["🟢 Positive", "🟡 Neutral", "🔴 Negative"][i % 3]) for i in range(n)]
+
+
+class ListRepository:
+    # แบบเดียวกับ SheetsRepository.report_rows_from: index = ตำแหน่งแถว
+    def __init__(self, app, rows):
+        self.app, self.rows, self.calls = app, rows, []
+
+    def report_rows_from(self, cursor):
+        df = self.app.pd.DataFrame(self.rows[cursor or 0:], columns=self.app.SHEET_COLUMNS["Reports"])
+        df.index += cursor or 0
+        self.calls.append(len(df))
+        return df
+
+
+def snapshot(stats):
+    return (stats.n_rows, stats.visits_frame().to_dict(), stats.sentiment_frame().to_dict(), stats.latency_frame().to_dict())
+
+
+def full_recompute(app, rows):
+    return snapshot(app.ReportAggregates().update(ListRepository(app, rows), 0))
+
+
+def test_incremental_matches_full_recompute(app):
+    rows = sample_reports(500)
+    repo = ListRepository(app, rows[:200])
+    stats = app.ReportAggregates()
+    stats.update(repo, 0)
+    repo.rows = rows
+    stats.update(repo, 0)
+    assert repo.calls == [200, 301]  # รอบสองอ่านแค่แถวเดิม 1 แถว + แถวใหม่
+    assert snapshot(stats) == full_recompute(app, rows)
+
+
+def test_rebuilds_when_counted_row_changes(app):
+    rows = sample_reports(50)
+    repo = ListRepository(app, rows)
+    stats = app.ReportAggregates().update(repo, 0)
+    repo.rows = rows[:49] + [report(3, "r9", "Z")]
+    assert snapshot(stats.update(repo, 0)) == full_recompute(app, repo.rows)
+    repo.rows = rows[:10]
+    assert snapshot(stats.update(repo, 0)) == full_recompute(app, rows[:10])
+
+
+def test_sqlite_delta_and_reimport(app, tmp_path, monkeypatch):
+    repo = app.SQLiteRepository(str(tmp_path / "rc_sales.db"))
+    rows = sample_reports(30)
+    for row in rows[:20]: repo.append("Reports", row)
+    stats = app.ReportAggregates().update(repo, 0)
+    for row in rows[20:]: repo.append("Reports", row)
+    assert snapshot(stats.update(repo, 0)) == full_recompute(app, rows)
+    # import จากชีตใหม่ -> id เปลี่ยนทั้งหมด -> ต้องนับใหม่ ไม่ใช่บวกซ้ำ
+    monkeypatch.setattr(app, "fetch_sheets", lambda names: {"Reports": app.pd.DataFrame(rows[:5], columns=app.SHEET_COLUMNS["Reports"])})
+    repo.import_from_sheets(("Reports",))
+    assert snapshot(stats.update(repo, 0)) == full_recompute(app, rows[:5])
+
+
+def test_unchanged_update_is_constant_time_at_200k_rows(app, tmp_path):
+    repo = app.SQLiteRepository(str(tmp_path / "rc_sales.db"))
+    with repo._conn() as conn: repo._insert(conn, "Reports", sample_reports(200_000))
+    stats = app.ReportAggregates()
+    start = time.perf_counter()
+    stats.update(repo, 0)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    stats.update(repo, 0)
+    again = time.perf_counter() - start
+    assert stats.n_rows == 200_000
+    assert again < first / 20
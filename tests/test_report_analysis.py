@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def fake_llm(app, monkeypatch):
+    calls = []
+    def llm_complete(**kwargs):
+        calls.append(kwargs)
+        return json.dumps({"has_next_appointment": True, "appointment_date": "", "sentiment": "Positive"})
+    monkeypatch.setattr(app.st, "secrets", {"GROQ_API_KEY": "test"})
+    monkeypatch.setattr(app, "llm_complete", llm_complete)
+    return calls
+
+
+def test_assess_report_returns_appointment_and_sentiment_in_one_call(app, fake_llm):
+    result = app.assess_report("ลูกค้าพอใจมาก ยอดเดือนนี้ดี")
+    assert result == {"has_next_appointment": True, "appointment_date": "", "sentiment": "🟢 Positive"}
+    assert len(fake_llm) == 1 and fake_llm[0]["response_format"] == {"type": "json_object"}
+
+
+def test_assess_report_prefers_local_rule(app, fake_llm):
+    assert app.assess_report("ลูกค้าสั่งเพิ่ม")["has_next_appointment"] is False
+
+
+def test_assess_report_without_api_key(app, monkeypatch):
+    monkeypatch.setattr(app.st, "secrets", {})
+    assert app.assess_report("นัดพรุ่งนี้") is None
+
+
+@pytest.mark.parametrize("summary, expected", [
+    ("- **ข้อมูลเพิ่มเติม**: ลูกค้าสั่งเพิ่ม", False),  # LLM ตอบ true แต่กฎในเครื่องตัดสินว่าไม่มีนัด
+    ("- **ข้อมูลเพิ่มเติม**: ยอดเดือนนี้ดีมาก", True),  # กฎไม่ชัด -> ใช้คำตอบของ LLM
+])
+def test_analyze_voice_report_agrees_with_assess_report(app, monkeypatch, summary, expected):
+    monkeypatch.setattr(app.st, "secrets", {"GROQ_API_KEY": "test"})
+    monkeypatch.setattr(app, "llm_complete", lambda **kwargs: json.dumps(
+        {"summary": summary, "has_next_appointment": True, "appointment_date": "", "sentiment": "Neutral"}))
+    result = app.analyze_voice_report("เสียงดิบ", "ร้านเอ", app.pd.DataFrame())
+    assert result["has_next_appointment"] is expected
+    assert app.assess_report(summary)["has_next_appointment"] is expected
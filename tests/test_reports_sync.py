@@ -0,0 +1,54 @@
+import pytest
+
+from conftest import FakeWorksheet
+
+HEADER = ["Timestamp", "Sales_Rep", "Customer", "Topics", "Status", "Sentiment", "Summary"]
+
+
+def report(i):
+    return [f"2026-10-01 10:{i:02d}:00", "r1", f"C{i}", "t", "Completed", "🟡 Neutral", "s"]
+
+
+@pytest.fixture
+def sync(app, tmp_path):
+    sync = app.ReportsSync(str(tmp_path / "reports_cache.pkl"))
+    assert sync.ranges() == ["'Reports'"]  # ยังไม่มี state -> โหลดเต็ม
+    sync.apply([[HEADER, report(0), report(1)]])
+    return sync
+
+
+def customers(df):
+    return df["Customer"].tolist()
+
+
+def test_appends_only_the_delta(app, sync, fake_sheet):
+    fake_sheet["Reports"] = FakeWorksheet([])  # ห้ามโหลดเต็ม
+    assert sync.ranges() == ["'Reports'!1:1", "'Reports'!A3:G"]
+    df = sync.apply([[HEADER], [report(1), report(2), report(3)]])
+    assert customers(df) == ["C0", "C1", "C2", "C3"]
+    assert (sync.n_rows, sync.ranges()[1]) == (4, "'Reports'!A5:G")
+    assert fake_sheet["Reports"].calls == []
+
+
+def test_no_new_rows_keeps_frame(app, sync):
+    assert customers(sync.apply([[HEADER], [report(1)]])) == ["C0", "C1"]
+
+
+@pytest.mark.parametrize("header, delta", [
+    (HEADER + ["Extra"], [report(1)]),  # header เปลี่ยน
+    (HEADER, []),                       # แถวถูกลบจนสั้นกว่าเดิม
+    (HEADER, [report(9)]),              # แถวสุดท้ายที่เคยเห็นถูกแก้/ลบ
+])
+def test_resyncs_full_sheet_when_history_changed(app, sync, fake_sheet, header, delta):
+    ws = fake_sheet["Reports"] = FakeWorksheet([header, report(5)])
+    df = sync.apply([[header], delta])
+    assert customers(df) == ["C5"]
+    assert ws.calls == ["get_all_values"]
+    assert (sync.header, sync.n_rows) == (header, 1)
+
+
+def test_state_survives_restart_and_invalidate(app, sync):
+    restarted = app.ReportsSync(sync.cache_path)
+    assert (restarted.n_rows, customers(restarted.df)) == (2, ["C0", "C1"])
+    restarted.invalidate()
+    assert app.ReportsSync(sync.cache_path).ranges() == ["'Reports'"]
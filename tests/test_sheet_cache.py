@@ -0,0 +1,69 @@
+import threading
+import time
+
+import pytest
+
+HEADER = ["Customer", "topic", "desc", "status", "Sales_Rep", "due_date"]
+
+
+def mission(customer, topic):
+    return [customer, topic, "d", "pending", "r1", "-"]
+
+
+@pytest.fixture
+def sheet(app, monkeypatch):
+    # ชีต Missions ฝั่ง server + นับจำนวนครั้งที่โหลด
+    sheet = {"rows": [mission("A", "งานเดิม")], "fetches": 0}
+    def fetch_sheets(names):
+        sheet["fetches"] += 1
+        return {name: app.pd.DataFrame(sheet["rows"], columns=HEADER) for name in names}
+    monkeypatch.setattr(app, "fetch_sheets", fetch_sheets)
+    return sheet
+
+
+def topics(df):
+    return df["topic"].tolist()
+
+
+def test_reloads_only_after_ttl(app, sheet, write_queue):
+    cache = app.SheetCache(ttl=60)
+    first = cache.get(("Missions",))["Missions"]
+    assert topics(cache.get(("Missions",))["Missions"]) == ["งานเดิม"] and sheet["fetches"] == 1
+    first.loc[0, "topic"] = "แก้ในสำเนา"  # ผู้เรียกได้สำเนา แก้แล้วไม่กระทบ cache
+    assert topics(cache.get(("Missions",))["Missions"]) == ["งานเดิม"]
+    sheet["rows"].append(mission("B", "งานใหม่จากชีต"))
+    cache.entries["Missions"]["loaded_at"] -= 61
+    assert topics(cache.get(("Missions",))["Missions"]) == ["งานเดิม", "งานใหม่จากชีต"] and sheet["fetches"] == 2
+
+
+def test_reload_merges_rows_still_in_queue(app, sheet, write_queue):
+    write_queue.enqueue("Missions", mission("A", "ยังไม่ถึงชีต"))
+    assert topics(app.SheetCache(ttl=60).get(("Missions",))["Missions"]) == ["งานเดิม", "ยังไม่ถึงชีต"]
+
+
+def test_append_is_written_through_and_bumps_version(app, sheet, write_queue):
+    cache = app.SheetCache(ttl=60)
+    before = cache.get(("Missions",))["Missions"].attrs["data_version"]
+    cache.append_rows("Missions", [mission("B", "Follow up")], queue=write_queue)
+    after = cache.get(("Missions",))["Missions"]
+    assert topics(after) == ["งานเดิม", "Follow up"] and sheet["fetches"] == 1
+    assert after.attrs["data_version"] != before
+    assert write_queue.pending_rows("Missions") == [mission("B", "Follow up")]
+
+
+def test_reload_during_append_does_not_duplicate_row(app, sheet, write_queue, monkeypatch):
+    # regression: get() โหลดใหม่คั่นระหว่างเข้าคิวกับ write-through -> แถวเดียวกันมาทั้งจาก pending_rows และจาก write-through
+    cache = app.SheetCache(ttl=60)
+    cache.get(("Missions",))
+    cache.entries["Missions"]["loaded_at"] -= 61
+    readers = []
+    enqueue = write_queue.enqueue
+    def enqueue_then_reload(name, row):
+        enqueue(name, row)
+        readers.append(threading.Thread(target=cache.get, args=(("Missions",),)))
+        readers[-1].start()
+        time.sleep(0.2)
+    monkeypatch.setattr(write_queue, "enqueue", enqueue_then_reload)
+    cache.append_rows("Missions", [mission("B", "Follow up")], queue=write_queue)
+    readers[0].join()
+    assert topics(cache.get(("Missions",))["Missions"]) == ["งานเดิม", "Follow up"]
@@ -0,0 +1,47 @@
+import threading
+import time
+
+from conftest import FakeWorksheet
+
+HEADER = ["Customer", "topic", "desc", "status", "Sales_Rep", "due_date"]
+
+
+def test_writes_only_blank_due_dates(app, fake_sheet):
+    ws = fake_sheet["Missions"] = FakeWorksheet([
+        HEADER,
+        ["A", "นัด 5/11/69", "", "pending", "r1", ""],
+        ["B", "นัด 6/11/69", "", "pending", "r1", "2026-12-01"],  # มีค่าแล้ว (แก้มือ) -> ไม่ทับ
+        ["C", "ไม่มีวันที่", "", "pending", "r1", ""],
+    ])
+    assert app.sheets_backfill_due_dates() == 2
+    assert [row[5] for row in ws.rows[1:]] == ["2026-11-05", "2026-12-01", app.NO_DUE_DATE]
+    assert ws.calls == ["get_all_values", "batch_update"]
+
+
+def test_adds_header_to_legacy_sheet(app, fake_sheet):
+    ws = fake_sheet["Missions"] = FakeWorksheet([HEADER[:5], ["A", "นัด 5/11/69", "", "pending", "r1"]])
+    app.sheets_backfill_due_dates()
+    assert ws.rows == [HEADER, ["A", "นัด 5/11/69", "", "pending", "r1", "2026-11-05"]]
+
+
+class SlowReadWorksheet(FakeWorksheet):
+    # session อื่นลบงานของลูกค้า A ระหว่างที่ backfill อ่านชีตไปแล้วแต่ยังไม่เขียน
+    def get_all_values(self):
+        values = super().get_all_values()
+        self.deleter = threading.Thread(target=self.app.sheets_delete_customer_rows, args=("A",))
+        self.deleter.start()
+        time.sleep(0.2)
+        return values
+
+
+def test_delete_waits_for_backfill_write(app, fake_sheet):
+    ws = fake_sheet["Missions"] = SlowReadWorksheet([
+        HEADER,
+        ["A", "นัด 1/11/69", "", "pending", "r1", ""],
+        ["B", "นัด 2/11/69", "", "pending", "r1", ""],
+        ["C", "นัด 3/11/69", "", "pending", "r1", ""],
+    ])
+    ws.app = app
+    app.sheets_backfill_due_dates()
+    ws.deleter.join()
+    assert [(row[0], row[5]) for row in ws.rows[1:]] == [("B", "2026-11-02"), ("C", "2026-11-03")]
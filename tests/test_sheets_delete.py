@@ -0,0 +1,28 @@
+from conftest import FakeWorksheet
+
+HEADER = ["Customer", "topic", "desc", "status", "Sales_Rep", "due_date"]
+
+
+def missions(*customers):
+    return [HEADER] + [[c, f"งาน {c}", "", "pending", "r1", "-"] for c in customers]
+
+
+def test_deletes_all_rows_of_customer_in_one_batch(app, fake_sheet):
+    ws = fake_sheet["Missions"] = FakeWorksheet(missions("A", "B", "B", "C", "B"))
+    app.sheets_delete_customer_rows("B")
+    assert [row[0] for row in ws.rows] == ["Customer", "A", "C"]
+    assert ws.calls == ["col_values", "batch_update"]
+
+
+def test_stale_snapshot_does_not_delete_other_customer(app, fake_sheet):
+    ws = fake_sheet["Missions"] = FakeWorksheet(missions("A", "B", "C"))
+    # session อื่นปิดงานของ A ไปแล้ว ระหว่างที่ session นี้รอ LLM อยู่
+    app.sheets_delete_customer_rows("A")
+    app.sheets_delete_customer_rows("B")
+    assert [row[0] for row in ws.rows] == ["Customer", "C"]
+
+
+def test_no_rows_skips_batch_update(app, fake_sheet):
+    ws = fake_sheet["Missions"] = FakeWorksheet(missions("A"))
+    app.sheets_delete_customer_rows("Z")
+    assert ws.calls == ["col_values"]
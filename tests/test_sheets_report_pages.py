@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import FakeWorksheet
+
+
+class GridWorksheet(FakeWorksheet):
+    # ws.get(range) แบบ Sheets API: ตัดแถวว่างท้ายทิ้ง / ขอเกินขนาด grid -> 400
+    def __init__(self, rows, api_error):
+        super().__init__(rows)
+        self.api_error = api_error
+
+    def get(self, page_range):
+        self.calls.append(page_range)
+        first, last = (int("".join(c for c in part if c.isdigit())) for part in page_range.split(":"))
+        if first > len(self.rows): raise self.api_error(400, f"Range ('Reports'!{page_range}) exceeds grid limits. Max rows: {len(self.rows)}")
+        return self.rows[first - 1:last]
+
+
+def reports(n):
+    return [["Timestamp", "Sales_Rep", "Customer", "Topics", "Status", "Sentiment", "Summary"]] + \
+           [[f"2026-10-01 10:{i:02d}:00", "r1", "A", "t", "Completed", "", "s"] for i in range(n)]
+
+
+@pytest.mark.parametrize("n_rows, requests", [(5, 3), (4, 3), (0, 1)])
+def test_stops_on_short_page_or_grid_end(app, fake_sheet, api_error, n_rows, requests):
+    ws = fake_sheet["Reports"] = GridWorksheet(reports(n_rows), api_error)
+    repo = app.SheetsRepository()
+    pages = list(repo.iter_report_pages(repo.first_report_row, 2))
+    assert sum(len(p) for p in pages) == n_rows
+    assert [row_id for page in pages for row_id, _ in page] == list(range(2, n_rows + 2))
+    assert len(ws.calls) == requests
+
+
+def test_other_errors_propagate(app, fake_sheet, api_error):
+    ws = fake_sheet["Reports"] = GridWorksheet(reports(3), api_error)
+    ws.get = lambda page_range: (_ for _ in ()).throw(api_error(429, "Quota exceeded"))
+    with pytest.raises(app.gspread.exceptions.APIError): list(app.SheetsRepository().iter_report_pages(2, 2))
@@ -0,0 +1,80 @@
+import pytest
+
+
+@pytest.fixture
+def repo(app, tmp_path):
+    return app.SQLiteRepository(str(tmp_path / "rc_sales.db"))
+
+
+def report(ts, rep="r1", customer="A", sentiment="🟡 Neutral"):
+    return [ts, rep, customer, "t", "Completed", sentiment, "สรุป"]
+
+
+def test_append_and_load_round_trip(repo):
+    repo.append("Assignments", ["r1", "A"])
+    repo.append("Missions", ["A", "ถามราคา", "d", "pending", "r1", "-"])
+    data = repo.load(("Assignments", "Missions"))
+    assert data["Assignments"].values.tolist() == [["r1", "A"]]
+    assert data["Missions"].iloc[0]["topic"] == "ถามราคา"
+
+
+def test_load_reuses_frame_until_version_changes(app, repo, monkeypatch):
+    repo.append("Reports", report("2026-10-01 10:00:00"))
+    reads = []
+    read_sql_query = app.pd.read_sql_query
+    monkeypatch.setattr(app.pd, "read_sql_query", lambda *a, **k: reads.append(a[0]) or read_sql_query(*a, **k))
+    first = repo.load(("Reports",))["Reports"]
+    assert repo.load(("Reports",))["Reports"] is first
+    assert len(reads) == 1
+    repo.append("Reports", report("2026-10-02 10:00:00"))
+    assert len(repo.load(("Reports",))["Reports"]) == 2
+    assert len(reads) == 2
+
+
+def test_load_sees_reports_edited_by_another_process(app, repo):
+    repo.append("Reports", report("2026-10-01 10:00:00"))
+    repo.load(("Reports",))
+    with repo._conn() as conn: conn.execute('UPDATE reports SET "Sentiment" = ?', ("🟢 Positive",))
+    app.touch_reports_generation()  # สิ่งที่ batch job ทำหลังแก้แถว
+    assert repo.load(("Reports",))["Reports"].iloc[0]["Sentiment"] == "🟢 Positive"
+
+
+def test_close_visit_is_one_transaction(repo):
+    repo.append("Missions", ["A", "งานเก่า", "d", "pending", "r1", "-"])
+    repo.append("Missions", ["B", "งาน B", "d", "pending", "r1", "-"])
+    repo.close_visit(report("2026-10-01 10:00:00"), "A", ["A", "Follow up", "d", "pending", "r1", "2026-11-01"])
+    data = repo.load(("Missions", "Reports"))
+    assert data["Missions"]["topic"].tolist() == ["งาน B", "Follow up"]
+    assert len(data["Reports"]) == 1
+
+
+def test_backfills_due_dates_and_mission_reps(app, tmp_path):
+    db_path = str(tmp_path / "legacy.db")
+    repo = app.SQLiteRepository(db_path)
+    repo.append("Assignments", ["r2", "C"])
+    with repo._conn() as conn:
+        repo._insert(conn, "Missions", [["C", "นัด 5/11/69", "d", "pending", "", ""]])
+    reopened = app.SQLiteRepository(db_path)
+    row = reopened.load(("Missions",))["Missions"].iloc[0]
+    assert (row["Sales_Rep"], row["due_date"]) == ("r2", "2026-11-05")
+
+
+def test_iter_report_pages_and_update_sentiments(repo):
+    for day in range(1, 6): repo.append("Reports", report(f"2026-10-0{day} 10:00:00"))
+    pages = list(repo.iter_report_pages(repo.first_report_row, 2))
+    assert [len(p) for p in pages] == [2, 2, 1]
+    repo.update_report_sentiments({pages[0][0][0]: "🟢 Positive"})
+    assert repo.load(("Reports",))["Reports"]["Sentiment"].tolist()[:2] == ["🟢 Positive", "🟡 Neutral"]
+
+
+@pytest.mark.parametrize("value, expected", [("false", False), ("0", False), ("no", False), ("true", True), (False, False), (True, True)])
+def test_bool_setting_parses_strings(app, monkeypatch, value, expected):
+    monkeypatch.setattr(app, "get_setting", lambda key, default=None: value)
+    assert app.get_bool_setting("SHEETS_MIRROR", True) is expected
+
+
+def test_backend_missing_a_method_fails_at_construction(app):
+    class PartialRepository(app.SalesRepository):
+        def load(self, worksheet_names): return {}
+    with pytest.raises(TypeError, match="report_rows_from"): PartialRepository()
+    assert app.SheetsRepository().name == "sheets"  # backend จริงครบทุกเมธอด
@@ -0,0 +1,53 @@
+from conftest import FakeWorksheet
+
+MISSIONS_HEADER = ["Customer", "topic", "desc", "status", "Sales_Rep", "due_date"]
+
+
+def mission(customer, topic):
+    return [customer, topic, "d", "pending", "r1", "-"]
+
+
+def test_journal_is_replayed_after_restart(app, write_queue, tmp_path):
+    write_queue.enqueue("Reports", ["ts", "r1", "A"])
+    write_queue.enqueue_delete("Missions", "A")
+    with open(write_queue.journal_path, "a", encoding="utf-8") as f: f.write('{"id": "crash')  # บรรทัดที่เขียนไม่จบ
+    restarted = app.WriteBehindQueue(write_queue.journal_path)
+    assert [item.get("op", item["worksheet"]) for item in restarted.pending] == ["Reports", "delete_customer"]
+    assert restarted.pending_rows("Reports") == [["ts", "r1", "A"]]
+
+
+def test_delete_applies_between_appends_in_order(app, fake_sheet, write_queue):
+    ws = fake_sheet["Missions"] = FakeWorksheet([MISSIONS_HEADER, mission("A", "งานเก่า")])
+    write_queue.enqueue("Missions", mission("A", "งานค้างในคิว"))
+    write_queue.enqueue_delete("Missions", "A")
+    write_queue.enqueue("Missions", mission("A", "Follow up"))
+    assert write_queue.flush() is True
+    assert [row[1] for row in ws.rows[1:]] == ["Follow up"]
+    assert ws.calls == ["append_rows", "col_values", "batch_update", "append_rows"]
+    assert write_queue.pending == [] and write_queue.status()["flushed_rows"] == 3
+
+
+def test_partial_failure_keeps_only_unsent_items(app, fake_sheet, write_queue, api_error):
+    missions = fake_sheet["Missions"] = FakeWorksheet([MISSIONS_HEADER])
+    reports = fake_sheet["Reports"] = FakeWorksheet([["Timestamp"]])
+    reports.fail = api_error(429, "Quota exceeded")
+    write_queue.enqueue("Missions", mission("A", "งานใหม่"))
+    write_queue.enqueue("Reports", ["ts", "r1", "A"])
+    assert write_queue.flush() is False
+    assert len(missions.rows) == 2
+    assert [item["worksheet"] for item in write_queue.pending] == ["Reports"]
+    assert "Reports" in write_queue.status()["last_error"]
+    # journal เหลือเฉพาะแถวที่ยังไม่ถึงชีต -> restart แล้วไม่ส่ง Missions ซ้ำ
+    assert app.WriteBehindQueue(write_queue.journal_path).pending_rows("Missions") == []
+    reports.fail = None
+    assert write_queue.flush() is True and len(reports.rows) == 2
+
+
+def test_failed_delete_holds_back_later_appends(app, fake_sheet, write_queue, api_error):
+    ws = fake_sheet["Missions"] = FakeWorksheet([MISSIONS_HEADER, mission("A", "งานเก่า")])
+    ws.fail = api_error(500, "backend error")
+    write_queue.enqueue_delete("Missions", "A")
+    write_queue.enqueue("Missions", mission("A", "Follow up"))
+    assert write_queue.flush() is False
+    assert [item.get("op", "append") for item in write_queue.pending] == ["delete_customer", "append"]
+    assert [row[1] for row in ws.rows[1:]] == ["งานเก่า"]